@@ -9,22 +9,37 @@ Exports:
     create_app: Factory function that returns a configured Flask application instance
     db: SQLAlchemy database instance
     login_manager: Flask-Login manager instance
+    babel: Flask-Babel instance, configured by app.i18n
+    cache: Page cache for anonymous responses
+    principals: Cache of users' effective permission masks
+    audit: Batched writer for Activity log entries
+    replicas: Router sending GET request reads to read replicas
+    profiler: Opt-in per-request SQL profiler
 """
 
 import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_babel import Babel
 from config import Config
+from app.cache import PageCache
+from app.principals import PrincipalCache
+from app.audit import ActivityRecorder
+from app.replicas import ReplicaRouter, RoutingSession
+from app.profiler import SQLProfiler
+from app import database, images
 
 # Create extensions instances first
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 babel = Babel()
+cache = PageCache()
+principals = PrincipalCache()
+audit = ActivityRecorder()
+replicas = ReplicaRouter()
+profiler = SQLProfiler()
 
 def create_app():
     """
@@ -33,30 +48,49 @@ def create_app():
     Returns:
         Flask: A configured Flask application instance
     """
+    # i18n, the routes and the commands import the extensions defined above,
+    # so they can only be imported once this module has finished loading
+    # pylint: disable=import-outside-toplevel
     app = Flask(__name__)
     app.config.from_object(Config)
 
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
     login_manager.init_app(app)
-    babel.init_app(app)
+    from app import i18n
+    i18n.init_app(app)
+    cache.init_app(app)
+    principals.init_app(app)
+    audit.init_app(app)
 
     # Enable Jinja2 extensions
     app.jinja_env.add_extension('jinja2.ext.i18n')
 
-    # Create upload directory if it doesn't exist
+    # Create upload directories if they don't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['UPLOAD_STAGING_FOLDER'], exist_ok=True)
 
     with app.app_context():
-        from app.routes import auth, main, admin, profile, news
+        database.init_app(app)
+        replicas.init_app(app)
+        profiler.init_app(app)
+
+        from app.routes import auth, main, admin, profile, news, search, feeds
         app.register_blueprint(auth.bp)
         app.register_blueprint(main.bp)
         app.register_blueprint(admin.bp)
         app.register_blueprint(profile.bp)
         app.register_blueprint(news.bp)
+        app.register_blueprint(search.bp)
+        app.register_blueprint(feeds.bp)
+
+        from app import commands
+        commands.init_app(app)
+        images.init_app(app)
 
-        # Create all tables
-        db.create_all()
+        # Production deployments let migrations own the schema and skip
+        # the reflection round-trips create_all costs on every worker boot
+        if app.config['CREATE_TABLES_ON_STARTUP']:
+            db.create_all()
 
     return app
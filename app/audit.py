@@ -0,0 +1,153 @@
+"""
+Activity log module.
+
+Views record audit entries with ``audit.record(action, details)`` instead of
+adding Activity rows and committing them separately. Entries are queued on
+the request and written with one bulk INSERT inside the request's own
+commit, so logging never costs an extra transaction.
+
+Entries still queued when a request ends without committing (and entries
+recorded outside a request, e.g. from CLI commands) go to a background
+flusher. It writes them in batches of up to ACTIVITY_BATCH_SIZE at least
+every ACTIVITY_FLUSH_INTERVAL seconds. Its queue holds ACTIVITY_QUEUE_SIZE
+entries; when it is full, producers wait for room and after
+ACTIVITY_QUEUE_TIMEOUT seconds write the entry themselves. The flusher
+drains its queue when the interpreter exits cleanly.
+
+Exports:
+    ActivityRecorder: Flask extension queueing and writing Activity rows
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from datetime import datetime
+from flask import g, has_request_context
+from flask_login import current_user
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _insert_activity():
+    # app.models needs the db this package creates after importing audit
+    from app.models import Activity  # pylint: disable=import-outside-toplevel
+    return Activity.__table__.insert()
+
+
+class ActivityRecorder:
+    """Queue Activity entries and write them in bulk."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Hook the recorder into the session's commits and request teardown.
+
+        Args:
+            app (Flask): Application instance
+        """
+        session = app.extensions['sqlalchemy'].session
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config['ACTIVITY_QUEUE_SIZE'])
+        if not event.contains(session, 'before_commit', self._write_with_commit):
+            event.listen(session, 'before_commit', self._write_with_commit)
+        app.teardown_request(self._hand_off)
+        app.extensions['activity_recorder'] = self
+
+    def record(self, action, details=None, user_id=None):
+        """
+        Queue an activity entry.
+
+        Inside a request the entry is written by the request's next commit;
+        otherwise it goes to the background flusher.
+
+        Args:
+            action (str): Short description, e.g. 'Edit role'
+            details (str): Optional free text
+            user_id (int): Acting user; defaults to the current user
+        """
+        if user_id is None:
+            user_id = current_user.id
+        entry = {'user_id': user_id, 'action': action, 'details': details,
+                 'timestamp': datetime.utcnow()}
+        if has_request_context():
+            g.setdefault('pending_activities', []).append(entry)
+        else:
+            self._enqueue(entry)
+
+    def _write_with_commit(self, session):
+        if not has_request_context():
+            return
+        entries = g.pop('pending_activities', None)
+        if entries:
+            session.execute(_insert_activity(), entries)
+
+    def _hand_off(self, exc):
+        # Entries from a failed request describe changes that were rolled back
+        entries = g.pop('pending_activities', None)
+        if entries and exc is None:
+            for entry in entries:
+                self._enqueue(entry)
+
+    def _enqueue(self, entry):
+        self._ensure_flusher()
+        try:
+            self._queue.put(entry, timeout=self.app.config['ACTIVITY_QUEUE_TIMEOUT'])
+        except queue.Full:
+            logger.warning('Activity queue full, writing entry synchronously')
+            self._write([entry])
+
+    def _ensure_flusher(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='activity-flusher',
+                                                daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        batch_size = self.app.config['ACTIVITY_BATCH_SIZE']
+        interval = self.app.config['ACTIVITY_FLUSH_INTERVAL']
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=interval)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                    if stopping or len(batch) >= batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.exception('Could not write %d activity entries', len(batch))
+
+    def _write(self, entries):
+        with self.app.app_context():
+            with self.app.extensions['sqlalchemy'].engine.begin() as connection:
+                connection.execute(_insert_activity(), entries)
+
+    def shutdown(self):
+        """Write every queued entry and stop the background flusher."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
@@ -0,0 +1,325 @@
+"""
+Benchmark module.
+
+Measurements behind the ``flask bench`` commands. Each benchmark returns
+plain dictionaries so results can be printed as JSON and compared across
+commits.
+
+Exports:
+    percentile: Nearest-rank percentile of a list of samples
+    concurrency_benchmark: Mixed read/write throughput per engine profile
+    startup_benchmark: Cold-start timings of fresh interpreters
+    load_benchmark: In-process throughput and latency of the main routes
+"""
+
+import json
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from app.database import apply_pragmas, sqlite_pragmas
+
+# Newest-posts listing, the most common read on the site
+READ_QUERY = text('SELECT id, title, created_at FROM post '
+                  'ORDER BY created_at DESC, id DESC LIMIT 20')
+# Takes the same locks as a real write without changing any data
+WRITE_QUERY = text('UPDATE post SET comment_count = comment_count WHERE id = :id')
+
+
+def percentile(samples, pct):
+    """
+    Return the nearest-rank percentile of samples.
+
+    Args:
+        samples (list): Numbers, in any order
+        pct (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile, or None if there are no samples
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def _concurrency_worker(uri, engine_options, pragmas, duration, write_ratio, seed):
+    engine = create_engine(uri, **engine_options)
+    if pragmas:
+        event.listen(engine, 'connect',
+                     lambda dbapi_connection, record: apply_pragmas(dbapi_connection, pragmas))
+    rng = random.Random(seed)
+    with engine.connect() as connection:
+        low, high = connection.execute(text('SELECT min(id), max(id) FROM post')).one()
+
+    ops = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if low is not None and rng.random() < write_ratio:
+                with engine.begin() as connection:
+                    connection.execute(WRITE_QUERY, {'id': rng.randint(low, high)})
+            else:
+                with engine.connect() as connection:
+                    connection.execute(READ_QUERY).fetchall()
+        except OperationalError:
+            errors += 1
+            continue
+        ops += 1
+        latencies.append(time.perf_counter() - start)
+    engine.dispose()
+    return ops, errors, latencies
+
+
+def _sqlite_copy(database, directory, name, journal_mode):
+    # The journal mode is stored in the database file, so every profile
+    # runs against its own copy, switched before any worker connects
+    path = os.path.join(directory, name)
+    source, target = sqlite3.connect(database), sqlite3.connect(path)
+    try:
+        source.backup(target)
+        target.execute(f'PRAGMA journal_mode = {journal_mode}')
+    finally:
+        source.close()
+        target.close()
+    return path
+
+
+def concurrency_benchmark(config, workers=4, duration=10.0, write_ratio=0.1):
+    """
+    Compare throughput of the default engine setup with the configured one.
+
+    Each profile runs ``workers`` processes, like gunicorn workers, issuing
+    the newest-posts query and, with probability write_ratio, a no-op
+    UPDATE of a random post. SQLite profiles run on private copies of the
+    database; other backends run against the configured database.
+
+    Args:
+        config (dict): Application configuration
+        workers (int): Concurrent worker processes
+        duration (float): Seconds each profile runs
+        write_ratio (float): Share of operations that write
+
+    Returns:
+        list: One dict per profile with ops_per_sec, errors and p50/p95/p99 latency in ms
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    url = make_url(uri)
+    sqlite = url.get_backend_name() == 'sqlite'
+    if sqlite:
+        # SQLite's own default is a rollback journal
+        profiles = [
+            ('default', {}, {'journal_mode': 'DELETE'}),
+            ('tuned', config['SQLALCHEMY_ENGINE_OPTIONS'], sqlite_pragmas(config)),
+        ]
+    else:
+        profiles = [
+            ('default', {}, None),
+            ('tuned', config['SQLALCHEMY_ENGINE_OPTIONS'], None),
+        ]
+
+    results = []
+    directory = tempfile.mkdtemp(prefix='bench-') if sqlite else None
+    try:
+        for name, engine_options, pragmas in profiles:
+            target = uri
+            if sqlite:
+                target = 'sqlite:///' + _sqlite_copy(url.database, directory, f'{name}.db',
+                                                     pragmas.pop('journal_mode'))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_concurrency_worker, target, engine_options, pragmas,
+                                       duration, write_ratio, seed)
+                           for seed in range(workers)]
+                outcomes = [future.result() for future in futures]
+            latencies = [sample for _, _, samples in outcomes for sample in samples]
+            ops = sum(count for count, _, _ in outcomes)
+            results.append({
+                'profile': name,
+                'workers': workers,
+                'ops_per_sec': round(ops / duration, 1),
+                'errors': sum(count for _, count, _ in outcomes),
+                'p50_ms': _ms(percentile(latencies, 50)),
+                'p95_ms': _ms(percentile(latencies, 95)),
+                'p99_ms': _ms(percentile(latencies, 99)),
+            })
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+# Runs in a fresh interpreter; reports milliseconds since interpreter start
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+status = application.test_client().get('/').status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'total_ms': (served - start) * 1000,
+    'status': status,
+}))
+"""
+
+
+def startup_benchmark(runs=5):
+    """
+    Time cold starts with and without create_all on boot.
+
+    Each run starts a new interpreter that imports the app, builds it with
+    create_app and serves the home page once, like a fresh gunicorn worker.
+
+    Args:
+        runs (int): Interpreters started per mode
+
+    Returns:
+        list: One dict per mode with median import, create_app, first request
+            and total times in ms
+    """
+    project = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for mode, create_tables in (('create_all', 'true'), ('migrations', 'false')):
+        env = dict(os.environ, CREATE_TABLES_ON_STARTUP=create_tables)
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=project, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        result = {'mode': mode, 'runs': runs}
+        for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+            result[key] = round(statistics.median(sample[key] for sample in samples), 1)
+        results.append(result)
+    return results
+
+
+# Scenario name -> (method, expected status); named after the endpoint they drive
+LOAD_SCENARIOS = {
+    'main.index': ('GET', 200),
+    'main.post': ('GET', 200),
+    'news.index': ('GET', 200),
+    'admin.dashboard': ('GET', 200),
+    'auth.login': ('POST', 302),
+    'main.add_comment': ('POST', 302),
+}
+
+
+class _LoadClient:
+    """Per-thread test clients: one anonymous, one signed in as the admin."""
+
+    def __init__(self, app, admin_id):
+        self.anonymous = app.test_client()
+        self.admin = app.test_client()
+        with self.admin.session_transaction() as session:
+            session['_user_id'] = str(admin_id)
+            session['_fresh'] = True
+
+
+def _load_request(app, client, scenario, rng, fixtures):
+    if scenario == 'main.index':
+        return client.anonymous.get('/')
+    if scenario == 'main.post':
+        return client.anonymous.get(f'/post/{rng.choice(fixtures["post_ids"])}')
+    if scenario == 'news.index':
+        return client.anonymous.get('/news/')
+    if scenario == 'admin.dashboard':
+        return client.admin.get('/admin/')
+    if scenario == 'auth.login':
+        # A fresh client, so every attempt starts signed out
+        return app.test_client().post('/login', data={'username': fixtures['username'],
+                                                      'password': fixtures['password']})
+    if scenario == 'main.add_comment':
+        return client.admin.post(f'/post/{rng.choice(fixtures["post_ids"])}/comment',
+                                 data={'content': 'Load benchmark comment.'})
+    raise ValueError(f'Unknown scenario {scenario}')
+
+
+def load_benchmark(app, fixtures, scenarios=None, requests=200, concurrency=1, warmup=10):
+    """
+    Drive the WSGI app in-process and time each scenario.
+
+    Requests go through the Flask test client, so the numbers cover routing,
+    views, templates and the database but not a web server or the network.
+    Each thread uses its own clients, and every request runs in its own
+    application context. The comment scenario writes to the database.
+
+    Args:
+        app (Flask): Application under test
+        fixtures (dict): post_ids (ids to request and comment on), admin_id,
+            and username and password of an account for the login scenario
+        scenarios (list): Names from LOAD_SCENARIOS; all of them by default
+        requests (int): Timed requests per scenario
+        concurrency (int): Threads issuing requests at the same time
+        warmup (int): Untimed requests per scenario made first
+
+    Returns:
+        list: One dict per scenario with requests_per_sec, errors and
+            p50/p95/p99 latency in ms
+    """
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = _LoadClient(app, fixtures['admin_id'])
+        return local.client
+
+    def run(scenario, count, seed):
+        rng = random.Random(seed)
+        expected = LOAD_SCENARIOS[scenario][1]
+        latencies, errors = [], 0
+        for _ in range(count):
+            start = time.perf_counter()
+            response = _load_request(app, client(), scenario, rng, fixtures)
+            elapsed = time.perf_counter() - start
+            if response.status_code != expected:
+                errors += 1
+            latencies.append(elapsed)
+        return latencies, errors
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for scenario in scenarios or LOAD_SCENARIOS:
+            if warmup:
+                pool.submit(run, scenario, warmup, -1).result()
+            shares = [requests // concurrency + (worker < requests % concurrency)
+                      for worker in range(concurrency)]
+            start = time.perf_counter()
+            outcomes = [future.result() for future in
+                        [pool.submit(run, scenario, share, worker)
+                         for worker, share in enumerate(shares) if share]]
+            elapsed = time.perf_counter() - start
+            latencies = [sample for samples, _ in outcomes for sample in samples]
+            results.append({
+                'scenario': scenario,
+                'method': LOAD_SCENARIOS[scenario][0],
+                'requests': len(latencies),
+                'concurrency': concurrency,
+                'errors': sum(count for _, count in outcomes),
+                'requests_per_sec': round(len(latencies) / elapsed, 1),
+                'p50_ms': _ms(percentile(latencies, 50)),
+                'p95_ms': _ms(percentile(latencies, 95)),
+                'p99_ms': _ms(percentile(latencies, 99)),
+            })
+    return results
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
@@ -0,0 +1,378 @@
+"""
+Page cache module.
+
+This module caches rendered responses for anonymous visitors. Entries are
+keyed by endpoint, view arguments, query string, locale, auth state and, for
+views behind app.conditional, the page's ETag, and are grouped under tags
+(e.g. ``posts`` or ``post:42``). Write paths call
+PageCache.invalidate with the tags they affect after committing; each tag
+carries a version token that is part of every dependent key, so bumping it
+retires exactly the entries built from that content and nothing else.
+
+Backends are selected with CACHE_TYPE:
+    - lru: In-process LRU with entry-count and TTL eviction (default)
+    - filesystem: Pickled entries under CACHE_DIR, shared by all workers on a host,
+      swept of expired and oldest files past CACHE_DIR_MAX_ENTRIES
+    - redis: Any Redis-protocol server at CACHE_REDIS_URL (needs the redis package)
+    - null: Caching disabled
+
+Exports:
+    PageCache: Flask extension providing the cached decorator and invalidate
+    LRUCache, FileSystemCache, RedisCache, NullCache: Storage backends
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from flask import g, request, session, current_app
+from flask_babel import get_locale
+from flask_login import current_user
+
+
+class NullCache:
+    """Backend that stores nothing."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with least-recently-used eviction.
+
+    Args:
+        max_entries (int): Entries kept before the least recently used is dropped
+        default_timeout (int): Seconds an entry lives when set without a timeout
+    """
+
+    def __init__(self, max_entries=1000, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class FileSystemCache:
+    """
+    Cache stored as one pickle file per key, shared between processes.
+
+    Each file holds the expiry time followed by the value, so a sweep can
+    read the expiry without unpickling the page. Superseded entries are
+    never read again, so once a set leaves more than max_entries files the
+    expired ones are deleted, then the least recently written, down to
+    three quarters of max_entries so the next sets do not sweep again.
+
+    Args:
+        directory (str): Directory holding cache files; created if missing
+        default_timeout (int): Seconds an entry lives when set without a timeout
+        max_entries (int): Files kept before a set sweeps the directory
+    """
+
+    def __init__(self, directory, default_timeout=300, max_entries=2000):
+        self.directory = directory
+        self.default_timeout = default_timeout
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _entries(self):
+        # Files still being written are dot-prefixed temporaries
+        try:
+            return [entry for entry in os.scandir(self.directory)
+                    if not entry.name.startswith('.')]
+        except OSError:
+            return []
+
+    def _prune(self):
+        entries = self._entries()
+        if len(entries) <= self.max_entries:
+            return
+        now = time.time()
+        kept = []
+        for entry in entries:
+            try:
+                with open(entry.path, 'rb') as f:
+                    expires_at = pickle.load(f)
+                if expires_at is not None and expires_at < now:
+                    os.remove(entry.path)
+                    continue
+                kept.append((entry.stat().st_mtime, entry.path))
+            except (OSError, EOFError, pickle.UnpicklingError):
+                continue
+        kept.sort()
+        for _, path in kept[:max(0, len(kept) - self.max_entries * 3 // 4)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires_at = pickle.load(f)
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return None
+        return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.time() + timeout if timeout else None
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(expires_at, f, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._prune()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def __len__(self):
+        return len(self._entries())
+
+
+class RedisCache:
+    """
+    Cache stored on a Redis-protocol server (Redis, Valkey, KeyDB...).
+
+    Args:
+        url (str): Server URL, e.g. redis://localhost:6379/0
+        default_timeout (int): Seconds an entry lives when set without a timeout
+        prefix (str): Namespace prepended to every key
+    """
+
+    def __init__(self, url, default_timeout=300, prefix='rpm:'):
+        # Optional dependency, only needed when CACHE_TYPE=redis
+        try:
+            import redis  # pylint: disable=import-outside-toplevel
+        except ImportError as e:
+            raise RuntimeError('CACHE_TYPE=redis requires the redis package') from e
+        self.client = redis.Redis.from_url(url)
+        self.default_timeout = default_timeout
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self.client.set(self.prefix + key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                        ex=timeout or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def __len__(self):
+        return self.client.dbsize()
+
+
+class PageCache:
+    """
+    Flask extension caching rendered responses for anonymous visitors.
+
+    Hit and miss counters are kept per process and exposed through stats().
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the backend selected by CACHE_TYPE.
+
+        Args:
+            app (Flask): Application to read configuration from
+        """
+        cache_type = app.config['CACHE_TYPE']
+        timeout = app.config['CACHE_DEFAULT_TIMEOUT']
+        if cache_type == 'lru':
+            self.backend = LRUCache(app.config['CACHE_LRU_MAX_ENTRIES'], timeout)
+        elif cache_type == 'filesystem':
+            self.backend = FileSystemCache(app.config['CACHE_DIR'], timeout,
+                                           app.config['CACHE_DIR_MAX_ENTRIES'])
+        elif cache_type == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'], timeout)
+        elif cache_type == 'null':
+            self.backend = NullCache()
+        else:
+            raise ValueError(f'Unknown CACHE_TYPE: {cache_type}')
+        app.extensions['page_cache'] = self
+
+    def _tag_version(self, tag):
+        key = 'tag:' + tag
+        version = self.backend.get(key)
+        if version is None:
+            # A fresh random token, so a tag evicted from the cache can never
+            # bring back entries built under an older version.
+            version = uuid.uuid4().hex[:12]
+            self.backend.set(key, version, timeout=0)
+        return version
+
+    def invalidate(self, *tags):
+        """
+        Retire every cached entry that depends on any of the given tags.
+
+        Call after the write has been committed.
+
+        Args:
+            *tags (str): Tags such as 'posts' or 'post:42'
+        """
+        for tag in tags:
+            self.backend.set('tag:' + tag, uuid.uuid4().hex[:12], timeout=0)
+            self.invalidations += 1
+
+    def versions(self, *tags):
+        """
+        Return the current versions of tags as one string.
+
+        The string changes whenever any of the tags is invalidated, so it can
+        be used in keys of entries cached outside the cached decorator.
+
+        Args:
+            *tags (str): Tags such as 'posts' or 'post:42'
+
+        Returns:
+            str: Tags with their version tokens
+        """
+        return ','.join(f'{tag}@{self._tag_version(tag)}' for tag in tags)
+
+    def _is_cacheable(self):
+        # Authenticated pages vary per user and a pending flash message must
+        # be rendered, so only clean anonymous GETs are served from cache.
+        return (request.method == 'GET'
+                and not current_user.is_authenticated
+                and '_flashes' not in session)
+
+    def _key(self, tags):
+        versions = self.versions(*tags)
+        view_args = ','.join(f'{k}={v}' for k, v in sorted((request.view_args or {}).items()))
+        query = request.query_string.decode()
+        # Set by app.conditional for views with validators: anything they
+        # track, such as the author's updated_at, retires the entry too
+        validators = g.get('validators_etag', '')
+        return (f'view:{request.endpoint}:{view_args}:{query}:{get_locale()}:anon:'
+                f'{validators}:{versions}')
+
+    def cached(self, tags, timeout=None):
+        """
+        Cache a view's response for anonymous GET requests.
+
+        Args:
+            tags (callable): Called with the view's keyword arguments; returns
+                the list of tags the rendered page depends on
+            timeout (int): Entry lifetime in seconds; CACHE_DEFAULT_TIMEOUT if None
+
+        Returns:
+            callable: View decorator
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if not self._is_cacheable():
+                    return f(*args, **kwargs)
+
+                key = self._key(tags(**kwargs))
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    body, status, content_type = entry
+                    response = current_app.response_class(body, status=status, content_type=content_type)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self.misses += 1
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    self.backend.set(key, (response.get_data(), response.status_code,
+                                           response.content_type), timeout)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return decorated_function
+        return decorator
+
+    def stats(self):
+        """
+        Return this process's cache counters.
+
+        Returns:
+            dict: backend, entries, hits, misses, hit_ratio and invalidations
+        """
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+        }
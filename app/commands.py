@@ -0,0 +1,508 @@
+"""
+CLI commands module.
+
+This module defines maintenance commands available through the Flask CLI
+(``flask <group> <command>``). Commands are registered on the application
+by init_app, which is called from the application factory.
+
+Commands:
+    - flask counters comments: Recompute Post.comment_count in batches
+    - flask counters stats: Recount the admin dashboard statistics
+    - flask counters subjects: Recount the news articles per subject
+    - flask counters categories: Recount the posts per category
+    - flask counters users: Recount the per-user profile counters
+    - flask search rebuild: Recreate the full-text search index
+    - flask images backfill: Generate missing variants for stored images
+    - flask passwords benchmark: Measure login throughput per hashing pool size
+    - flask queries check: Fail if a route's query falls back to a full scan
+    - flask bench concurrency: Compare default and tuned database engine throughput
+    - flask bench startup: Time imports, create_app and the first request
+    - flask bench load: Throughput and latency of the main routes, in-process
+    - flask data seed: Fill the database with generated rows in bulk
+    - flask import users|posts|comments|news: Bulk load rows from a JSONL file
+    - flask export posts|comments|users|activity: Stream rows out as CSV or JSONL
+    - flask db ...: Flask-Migrate commands, loaded only when invoked
+    - flask init-db: Create the schema on an empty database, else apply migrations
+
+This module is imported by every web worker through create_app, so the
+modules only the commands need (benchmarks, seeding, importer, exports,
+queryplans, multiprocessing) are imported inside the command callbacks.
+"""
+
+# Deferred imports keep the CLI-only modules out of the web workers
+# pylint: disable=import-outside-toplevel
+
+import json
+import os
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import bindparam, func, inspect as sa_inspect
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import db, cache, search, images, stats
+from app.cache import NullCache
+from app.models import Post, Comment, User
+
+class LazyGroup(AppGroup):
+    """
+    Command group whose commands are added by a loader on first use.
+
+    Used for groups that build one command per entry of a table defined in
+    a module the web workers never need.
+    """
+
+    def __init__(self, name, loader, **kwargs):
+        super().__init__(name, **kwargs)
+        self.loader = loader
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            self.loader(self)
+
+    def list_commands(self, ctx):
+        self._load()
+        return super().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        self._load()
+        return super().get_command(ctx, cmd_name)
+
+
+counters_cli = AppGroup('counters', help='Recompute and repair denormalized counters.')
+search_cli = AppGroup('search', help='Manage the full-text search index.')
+images_cli = AppGroup('images', help='Manage uploaded images and their variants.')
+passwords_cli = AppGroup('passwords', help='Password hashing tools.')
+queries_cli = AppGroup('queries', help='Inspect the SQL issued by the routes.')
+bench_cli = AppGroup('bench', help='Performance benchmarks reporting JSON.')
+data_cli = AppGroup('data', help='Generate synthetic data for load testing.')
+
+# Counter repairs must not look like content edits, so updated_at is kept as is
+REPAIR_COMMENT_COUNT = Post.__table__.update() \
+    .where(Post.__table__.c.id == bindparam('post_id')) \
+    .values(comment_count=bindparam('count'), updated_at=Post.__table__.c.updated_at)
+
+
+@counters_cli.command('comments')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of posts checked per transaction.')
+def recount_comments(batch_size):
+    """Recompute Post.comment_count from the comment table."""
+    last_id = 0
+    checked = repaired = 0
+    while True:
+        batch = db.session.query(Post.id, Post.comment_count) \
+            .filter(Post.id > last_id) \
+            .order_by(Post.id) \
+            .limit(batch_size) \
+            .all()
+        if not batch:
+            break
+
+        ids = [post_id for post_id, _ in batch]
+        actual = dict(
+            db.session.query(Comment.post_id, func.count(Comment.id))
+            .filter(Comment.post_id.in_(ids))
+            .group_by(Comment.post_id)
+        )
+        fixes = [
+            {'post_id': post_id, 'count': actual.get(post_id, 0)}
+            for post_id, stored in batch
+            if stored != actual.get(post_id, 0)
+        ]
+        if fixes:
+            db.session.execute(REPAIR_COMMENT_COUNT, fixes)
+        db.session.commit()
+
+        checked += len(batch)
+        repaired += len(fixes)
+        last_id = ids[-1]
+        click.echo(f'Checked {checked} posts, repaired {repaired}')
+
+    click.echo(f'Done: {repaired} of {checked} post counters repaired')
+
+
+@counters_cli.command('stats')
+def recount_stats():
+    """Recount the admin dashboard statistics from the source tables."""
+    for name, value in stats.reconcile_site_stats().items():
+        click.echo(f'{name}: {value}')
+
+
+@counters_cli.command('subjects')
+def recount_subjects():
+    """Recount the news articles per subject shown on the news page."""
+    for subject, count in sorted(stats.reconcile_news_subjects().items()):
+        click.echo(f'{subject}: {count}')
+
+
+@counters_cli.command('categories')
+def recount_categories():
+    """Recount the posts per category shown in the category navigation."""
+    for name, count in sorted(stats.reconcile_category_counts().items()):
+        click.echo(f'{name}: {count}')
+
+
+@counters_cli.command('users')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of users recounted per transaction.')
+def recount_users(batch_size):
+    """Recount the post, comment and news counters shown on profiles."""
+    recounted = 0
+    for recounted in stats.reconcile_user_stats(batch_size):
+        click.echo(f'Recounted {recounted} users')
+    click.echo(f'Done: {recounted} users recounted')
+
+
+@search_cli.command('rebuild')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Number of rows indexed per transaction.')
+def rebuild_search_index(batch_size):
+    """Drop and rebuild the search index from posts and news."""
+    for model_name, indexed in search.rebuild_index(batch_size):
+        click.echo(f'Indexed {indexed} {model_name} rows')
+    click.echo('Search index rebuilt')
+
+
+@images_cli.command('backfill')
+def backfill_image_variants():
+    """Generate missing thumbnail, card and full variants for uploaded images."""
+    folder = current_app.config['UPLOAD_FOLDER']
+    originals = sorted(
+        name for name in os.listdir(folder)
+        if not name.startswith('.') and not images.is_variant(name)
+        and os.path.isfile(os.path.join(folder, name))
+    )
+    failed = 0
+    for name in originals:
+        try:
+            created = images.generate_variants(folder, name, current_app.config['IMAGE_QUALITY'])
+        except Exception as e:
+            failed += 1
+            click.echo(f'{name}: failed ({e})', err=True)
+            continue
+        if created:
+            click.echo(f'{name}: created {", ".join(created)}')
+    click.echo(f'Done: {len(originals)} images checked, {failed} failed')
+
+
+@passwords_cli.command('benchmark')
+@click.option('--logins', default=200, show_default=True,
+              help='Password checks performed per pool size.')
+@click.option('--workers', 'worker_counts', default='0,1,2,4', show_default=True,
+              help='Comma-separated pool sizes to compare; 0 checks inline.')
+def benchmark_passwords(logins, worker_counts):
+    """Report logins per second under the configured hash policy."""
+    from concurrent.futures import ProcessPoolExecutor
+    config = current_app.config
+    pwhash = generate_password_hash('benchmark', config['PASSWORD_HASH_METHOD'],
+                                    config['PASSWORD_SALT_LENGTH'])
+    hashes, attempts = [pwhash] * logins, ['benchmark'] * logins
+    click.echo(f'{config["PASSWORD_HASH_METHOD"]}, {logins} logins per run')
+    for workers in (int(count) for count in worker_counts.split(',')):
+        if workers == 0:
+            start = time.perf_counter()
+            list(map(check_password_hash, hashes, attempts))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Start every process before timing
+                list(pool.map(check_password_hash, hashes[:workers], attempts[:workers]))
+                start = time.perf_counter()
+                list(pool.map(check_password_hash, hashes, attempts))
+        elapsed = time.perf_counter() - start
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        click.echo(f'{label}: {logins / elapsed:.1f} logins/sec')
+
+
+@queries_cli.command('check')
+@click.option('--verbose', is_flag=True, help='Print every plan, not only failures.')
+def check_query_plans(verbose):
+    """EXPLAIN the queries of representative pages and fail on full scans."""
+    from app import queryplans
+    if db.engine.dialect.name not in queryplans.DIALECTS:
+        raise click.ClickException(f'Query plan checks do not support {db.engine.dialect.name}; '
+                                   f'use one of {", ".join(queryplans.DIALECTS)}')
+    captured = queryplans.capture_queries(current_app, queryplans.sample_urls())
+    failures = 0
+    with db.engine.connect() as connection:
+        for url, statement, parameters in captured:
+            with connection.begin():
+                plan = queryplans.explain(connection, statement, parameters)
+            scans = queryplans.full_scans(plan)
+            if scans or verbose:
+                click.echo(f'{url}: {" ".join(statement.split())[:120]}')
+                for line in plan:
+                    click.echo(f'    {line}')
+            failures += bool(scans)
+    click.echo(f'{len(captured)} queries checked, {failures} with full scans')
+    if failures:
+        raise SystemExit(1)
+
+
+@bench_cli.command('concurrency')
+@click.option('--workers', default=4, show_default=True, help='Concurrent worker processes.')
+@click.option('--duration', default=10.0, show_default=True, help='Seconds per profile.')
+@click.option('--write-ratio', default=0.1, show_default=True,
+              help='Share of operations that write.')
+def bench_concurrency(workers, duration, write_ratio):
+    """Compare read/write throughput of the default and configured engine setup."""
+    from app import benchmarks
+    results = benchmarks.concurrency_benchmark(current_app.config, workers, duration, write_ratio)
+    click.echo(json.dumps(results, indent=2))
+
+
+@bench_cli.command('startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters per mode.')
+def bench_startup(runs):
+    """Time imports, create_app and the first request with and without create_all."""
+    from app import benchmarks
+    results = benchmarks.startup_benchmark(runs)
+    click.echo(json.dumps(results, indent=2))
+
+
+@bench_cli.command('load')
+@click.option('--requests', default=200, show_default=True, help='Timed requests per scenario.')
+@click.option('--concurrency', default=1, show_default=True, help='Threads issuing requests.')
+@click.option('--warmup', default=10, show_default=True, help='Untimed requests per scenario.')
+@click.option('--scenario', 'scenarios', multiple=True,
+              help='Scenario to run; repeat for several. Default: all.')
+@click.option('--username', help='Account for the login scenario. Default: the first admin.')
+@click.option('--password',
+              help='Password of that account. Default: the one flask data seed sets.')
+@click.option('--no-cache', is_flag=True, help='Bypass the page cache.')
+def bench_load(requests, concurrency, warmup, scenarios, username, password, no_cache):
+    """Drive the main routes in-process and report throughput and latency.
+
+    Posts comments, so run it against a seeded copy (see flask data seed).
+    """
+    from app import benchmarks, seeding
+    unknown = set(scenarios) - set(benchmarks.LOAD_SCENARIOS)
+    if unknown:
+        raise click.BadParameter(f'{", ".join(sorted(unknown))}; choose from '
+                                 f'{", ".join(benchmarks.LOAD_SCENARIOS)}',
+                                 param_hint='--scenario')
+    admin = User.query.filter_by(is_admin=True, active=True).order_by(User.id).first()
+    post_ids = [post_id for post_id, in
+                db.session.query(Post.id).order_by(Post.id.desc()).limit(1000)]
+    if admin is None or not post_ids:
+        raise click.ClickException('Needs an active admin and at least one post; '
+                                   'run flask data seed first')
+    fixtures = {'admin_id': admin.id, 'post_ids': post_ids,
+                'username': username or admin.username,
+                'password': password or seeding.SEED_PASSWORD}
+    db.session.remove()
+
+    # The benchmark threads have no app context to resolve the proxy in;
+    # _get_current_object is Flask's documented way to unwrap it
+    app = current_app._get_current_object()  # pylint: disable=protected-access
+    backend = cache.backend
+    if no_cache:
+        cache.backend = NullCache()
+    try:
+        results = benchmarks.load_benchmark(app, fixtures, list(scenarios), requests,
+                                            concurrency, warmup)
+    finally:
+        cache.backend = backend
+    click.echo(json.dumps(results, indent=2))
+
+
+@data_cli.command('seed')
+@click.option('--users', default=1000, show_default=True)
+@click.option('--roles', default=0, show_default=True, help='Roles besides the defaults.')
+@click.option('--categories', default=10, show_default=True)
+@click.option('--posts', default=10000, show_default=True)
+@click.option('--comments', default=50000, show_default=True)
+@click.option('--news', default=500, show_default=True)
+@click.option('--activities', default=20000, show_default=True)
+@click.option('--days', default=365, show_default=True,
+              help='Period the timestamps are spread over.')
+@click.option('--batch-size', default=5000, show_default=True,
+              help='Rows inserted per transaction.')
+@click.option('--seed', default=0, show_default=True, help='Random seed.')
+@click.option('--skip-search-index', is_flag=True,
+              help='Do not rebuild the search index afterwards.')
+def seed_data(users, roles, categories, posts, comments, news, activities, days,
+              batch_size, seed, skip_search_index):
+    """Add generated users, posts, comments and more to the database."""
+    from app import seeding
+    start = time.perf_counter()
+    try:
+        for model_name, inserted in seeding.seed_database(
+                users, roles, categories, posts, comments, news, activities,
+                days, batch_size, seed):
+            click.echo(f'Inserted {inserted} {model_name} rows')
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if not skip_search_index:
+        indexed = dict(search.rebuild_index())
+        click.echo('Search index rebuilt: '
+                   + ', '.join(f'{count} {name}' for name, count in indexed.items()))
+    cache.invalidate('posts', 'news', 'categories')
+    click.echo(f'Done in {time.perf_counter() - start:.1f}s; '
+               f'generated users log in with password "{seeding.SEED_PASSWORD}"')
+
+
+def _import_command(group, kind):
+    from app import importer
+
+    @group.command(kind, help=f'Import {kind} from a JSONL file, one object per line. '
+                                   'Rerunning an interrupted import resumes after the '
+                                   'last committed batch.')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=5000, show_default=True,
+                  help='Rows inserted per transaction.')
+    @click.option('--restart', is_flag=True,
+                  help='Ignore earlier progress on this file and start over.')
+    @click.option('--show-errors', default=20, show_default=True,
+                  help='Rejected lines printed per batch.')
+    def import_rows(path, batch_size, restart, show_errors):
+        imported = rejected = 0
+        try:
+            for report in importer.import_jsonl(kind, path, batch_size, restart):
+                imported += report.imported
+                rejected += len(report.errors)
+                click.echo(f'Lines {report.first_line}-{report.last_line}: '
+                           f'{report.imported} imported, {len(report.errors)} rejected')
+                for line, message in report.errors[:show_errors]:
+                    click.echo(f'    line {line}: {message}', err=True)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        stats.reconcile_site_stats()
+        cache.invalidate('posts', 'news')
+        click.echo(f'Done: {imported} {kind} imported, {rejected} lines rejected')
+    return import_rows
+
+
+def _add_import_commands(group):
+    from app import importer
+    for kind in importer.KINDS:
+        _import_command(group, kind)
+
+
+def _export_command(group, kind):
+    from app import exports
+
+    @group.command(kind, help=f'Write {kind} as CSV or JSONL, oldest first.')
+    @click.option('--format', 'fmt', type=click.Choice(list(exports.FORMATS)), default='jsonl',
+                  show_default=True)
+    @click.option('--since', help='First day included, YYYY-MM-DD.')
+    @click.option('--until', help='Last day included, YYYY-MM-DD.')
+    @click.option('--category', help='Category name.')
+    @click.option('--author', help='Username of the author.')
+    @click.option('--output', type=click.File('w', encoding='utf-8'), default='-',
+                  help='File to write; standard output by default.')
+    def export_rows(fmt, since, until, category, author, output):
+        try:
+            filters = exports.parse_filters(kind, since, until, category, author)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        columns, rows = exports.export_rows(kind, filters)
+        for chunk in exports.encode(fmt, columns, rows):
+            output.write(chunk)
+    return export_rows
+
+
+def _add_export_commands(group):
+    from app import exports
+    for kind in exports.EXPORTS:
+        _export_command(group, kind)
+
+
+import_cli = LazyGroup('import', _add_import_commands, help='Bulk import rows from JSONL files.')
+export_cli = LazyGroup('export', _add_export_commands, help='Export rows as CSV or JSONL.')
+
+
+class MigrateGroup(click.Group):
+    """
+    Stand-in for Flask-Migrate's ``db`` group that imports it on first use.
+
+    Flask-Migrate pulls in Alembic, which is a large share of the import
+    time of a web worker that never runs migrations.
+    """
+
+    def __init__(self, app):
+        super().__init__('db', help='Perform database migrations.')
+        self.app = app
+        self._group = None
+
+    def _load(self):
+        if self._group is None:
+            from flask_migrate import Migrate
+            from flask_migrate.cli import db as db_cli_group
+            Migrate(self.app, db)
+            self._group = db_cli_group
+        return self._group
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self._load().get_command(ctx, cmd_name)
+
+
+def _missing_schema(inspector):
+    """Return the model tables and columns the database lacks, as table[.column] names."""
+    existing = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing:
+            missing.append(table.name)
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        missing += [f'{table.name}.{column.name}' for column in table.columns
+                    if column.name not in columns]
+    return missing
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create the schema on an empty database, otherwise apply pending migrations.
+
+    Run once before the web workers start, so they can skip create_all. A
+    database without migration history whose tables already match the models,
+    as create_all leaves it when CREATE_TABLES_ON_STARTUP is on, is stamped.
+    """
+    from flask_migrate import Migrate, stamp, upgrade
+    Migrate(current_app, db)
+    inspector = sa_inspect(db.engine)
+    table_names = inspector.get_table_names()
+    if 'alembic_version' in table_names:
+        upgrade()
+    elif not table_names:
+        # The migrations assume an existing baseline schema, so a new
+        # database gets the current models and is marked as up to date
+        db.create_all()
+        stamp()
+        click.echo('Created the schema and stamped it with the latest migration')
+    else:
+        missing = _missing_schema(inspector)
+        if missing:
+            raise click.ClickException(f'The database has tables but no migration history and '
+                                       f'lacks {", ".join(missing[:5])}; run "flask db stamp '
+                                       f'<revision>" for the revision its schema matches, then '
+                                       f'run this command again')
+        stamp()
+        click.echo('The schema matches the models; stamped it with the latest migration')
+
+
+def init_app(app):
+    """
+    Register CLI command groups on the application.
+
+    Args:
+        app (Flask): Application instance to register commands on
+    """
+    app.cli.add_command(MigrateGroup(app))
+    app.cli.add_command(init_db)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(images_cli)
+    app.cli.add_command(passwords_cli)
+    app.cli.add_command(queries_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(data_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(export_cli)
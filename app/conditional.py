@@ -0,0 +1,76 @@
+"""
+Conditional GET module.
+
+This module lets content views answer ``If-None-Match`` and
+``If-Modified-Since`` with 304 Not Modified before any template is rendered.
+Each view supplies a cheap validator function that reads only the timestamps
+and counters its page depends on; the page itself is rendered only when the
+client's copy is stale.
+
+Exports:
+    conditional: View decorator adding ETag/Last-Modified handling
+"""
+
+import hashlib
+from functools import wraps
+from flask import g, request, session, current_app
+from flask_babel import get_locale
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+
+def _etag(parts):
+    # The same URL renders differently per viewer and language, so both are
+    # part of the tag alongside the view's own validators.
+    viewer = current_user.get_id() if current_user.is_authenticated else 'anon'
+    raw = '|'.join(str(part) for part in (*parts, viewer, get_locale()))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let clients store the page but make them revalidate on every use
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    response.vary.add('Accept-Language')
+    return response
+
+
+def conditional(validators):
+    """
+    Serve 304 Not Modified for unchanged content before the view runs.
+
+    Args:
+        validators (callable): Called with the view's keyword arguments; returns
+            (etag_parts, last_modified) where etag_parts is an iterable of values
+            that change whenever the page changes and last_modified is a naive
+            UTC datetime or None. It should abort(404) for missing content.
+
+    Returns:
+        callable: View decorator
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+
+            etag_parts, last_modified = validators(**kwargs)
+            etag = _etag(etag_parts)
+            # The page cache keys entries by it, so a cached body is only
+            # served with the validators it was rendered under
+            g.validators_etag = etag
+            # A pending flash message has to be shown, so never 304 over it
+            if '_flashes' not in session and not is_resource_modified(
+                    request.environ, etag=etag, last_modified=last_modified):
+                return _set_validators(current_app.response_class(status=304),
+                                       etag, last_modified)
+
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                _set_validators(response, etag, last_modified)
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,99 @@
+"""
+Database engine tuning module.
+
+Pool settings for every backend come from SQLALCHEMY_ENGINE_OPTIONS, built in
+Config from the DB_POOL_* variables. SQLite has no server to tune, so this
+module applies a pragma profile to each new SQLite connection instead:
+write-ahead logging lets readers proceed while another worker writes,
+synchronous=NORMAL is durable enough with WAL, and busy_timeout makes
+writers wait for the lock instead of failing with "database is locked".
+
+Exports:
+    sqlite_pragmas: The pragma profile configured for an application
+    apply_pragmas: Run a pragma profile on a DB-API connection
+    tune_engine: Install the pragma listener on an engine
+    init_app: Tune the application's primary engine
+    sync_id_sequence: Move a PostgreSQL id sequence past explicitly inserted ids
+"""
+
+from sqlalchemy import event, text
+
+
+def sqlite_pragmas(config):
+    """
+    Build the SQLite pragma profile from configuration.
+
+    Args:
+        config (dict): Application configuration
+
+    Returns:
+        dict: Pragma name to value, in the order they are applied
+    """
+    return {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT'],
+        'cache_size': config['SQLITE_CACHE_SIZE'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+    }
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """
+    Run each pragma on a raw SQLite connection.
+
+    Args:
+        dbapi_connection: sqlite3 connection
+        pragmas (dict): Pragma name to value
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def tune_engine(engine, config):
+    """
+    Apply the SQLite pragma profile to every connection the engine opens.
+
+    Does nothing for other backends.
+
+    Args:
+        engine (Engine): Engine to tune
+        config (dict): Application configuration
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+def init_app(app):
+    """
+    Tune the application's primary engine.
+
+    Args:
+        app (Flask): Application whose engine is tuned
+    """
+    tune_engine(app.extensions['sqlalchemy'].engine, app.config)
+
+
+def sync_id_sequence(connection, table):
+    """
+    Move a table's id sequence past the largest id, after bulk inserts with
+    explicit ids. Only PostgreSQL needs it; other backends derive the next
+    id from the table.
+
+    Args:
+        connection: SQLAlchemy connection to write with
+        table (Table): Table with an integer ``id`` primary key
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('\"{table.name}\"', 'id'), "
+            f"(SELECT max(id) FROM \"{table.name}\"))"))
@@ -0,0 +1,210 @@
+"""
+Data export module.
+
+Streams posts, comments, users and activity out of the database as CSV or
+JSONL for the admin export endpoint and ``flask export``. Rows are read
+with ``yield_per`` (a server-side cursor where the driver has one) as
+plain column tuples, never ORM objects, and encoded a chunk at a time, so
+memory use does not grow with the size of the table.
+
+References are written the way ``flask import`` reads them: authors by
+username and categories by name. Password hashes are never exported. In
+CSV, text cells that a spreadsheet would run as a formula (starting with
+=, +, -, @, tab or carriage return) are prefixed with a single quote.
+
+Exports:
+    EXPORTS: Export definitions by kind name
+    FORMATS: Output formats and their MIME types
+    parse_filters: Validate since/until/category/author filters
+    export_rows: Stream the rows of one kind as (columns, rows)
+    encode: Turn streamed rows into CSV or JSONL text chunks
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import Activity, Category, Comment, Post, Role, User
+
+# Rows fetched from the cursor, and encoded, per round trip
+CHUNK_SIZE = 1000
+
+# Leading characters that make spreadsheets evaluate a CSV cell
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _posts():
+    author = aliased(User)
+    return (select(Post.id, Post.title, Post.content, author.username.label('author'),
+                   Category.name.label('category'), Post.comment_count,
+                   Post.created_at, Post.updated_at)
+            .join(author, Post.author_id == author.id)
+            .outerjoin(Category, Post.category_id == Category.id)
+            .order_by(Post.id)), Post.created_at, author, Category
+
+
+def _comments():
+    author = aliased(User)
+    return (select(Comment.id, Comment.post_id, author.username.label('author'),
+                   Comment.content, Comment.created_at, Comment.updated_at)
+            .join(author, Comment.author_id == author.id)
+            .order_by(Comment.id)), Comment.created_at, author, Category
+
+
+def _users():
+    return (select(User.id, User.username, User.email, Role.name.label('role'), User.is_admin,
+                   User.active, User.bio, User.location, User.website,
+                   User.newsletter_subscription, User.created_at)
+            .outerjoin(Role, User.role_id == Role.id)
+            .order_by(User.id)), User.created_at, None, None
+
+
+def _activity():
+    author = aliased(User)
+    return (select(Activity.id, author.username.label('user'), Activity.action,
+                   Activity.details, Activity.timestamp)
+            .join(author, Activity.user_id == author.id)
+            .order_by(Activity.id)), Activity.timestamp, author, None
+
+
+# Kind -> builder returning (statement, timestamp column, author alias or
+# None, Category if a category filter applies or None)
+EXPORTS = {
+    'posts': _posts,
+    'comments': _comments,
+    'users': _users,
+    'activity': _activity,
+}
+
+
+def parse_filters(kind, since=None, until=None, category=None, author=None):
+    """
+    Validate export filters given as strings.
+
+    Args:
+        kind (str): One of EXPORTS
+        since (str): First day included, YYYY-MM-DD
+        until (str): Last day included, YYYY-MM-DD
+        category (str): Category name (posts and comments)
+        author (str): Username of the author, or of the acting user for activity
+
+    Returns:
+        dict: Filters for export_rows, empty values dropped
+
+    Raises:
+        ValueError: If a date is malformed or a filter does not apply to kind
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f'Unknown export {kind!r}')
+    _, _, author_table, category_table = EXPORTS[kind]()
+    filters = {}
+    for name, value in (('since', since), ('until', until)):
+        if value:
+            try:
+                filters[name] = date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f'{name} must be a date like 2025-01-31') from None
+    if category:
+        if category_table is None:
+            raise ValueError(f'{kind} cannot be filtered by category')
+        filters['category'] = category
+    if author:
+        if author_table is None:
+            raise ValueError(f'{kind} cannot be filtered by author')
+        filters['author'] = author
+    return filters
+
+
+def export_rows(kind, filters):
+    """
+    Stream the rows of one kind, oldest first.
+
+    Must be consumed inside an application context (in a view, through
+    stream_with_context).
+
+    Args:
+        kind (str): One of EXPORTS
+        filters (dict): As returned by parse_filters
+
+    Returns:
+        tuple: (column names, iterator of row tuples)
+    """
+    stmt, timestamp, author, category = EXPORTS[kind]()
+    if 'since' in filters:
+        stmt = stmt.where(timestamp >= datetime.combine(filters['since'], datetime.min.time()))
+    if 'until' in filters:
+        stmt = stmt.where(timestamp < datetime.combine(filters['until'] + timedelta(days=1),
+                                                       datetime.min.time()))
+    if 'author' in filters:
+        stmt = stmt.where(author.username == filters['author'])
+    if 'category' in filters:
+        if kind == 'comments':
+            stmt = stmt.join(Post, Comment.post_id == Post.id) \
+                .join(category, Post.category_id == category.id)
+        stmt = stmt.where(category.name == filters['category'])
+    result = db.session.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+    return list(result.keys()), iter(result)
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _value(value)
+
+
+def _encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _encode_jsonl(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _value(value) for column, value in zip(columns, row)},
+                                ensure_ascii=False))
+        if len(lines) == CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def encode(fmt, columns, rows):
+    """
+    Encode streamed rows as text chunks of about CHUNK_SIZE rows each.
+
+    Args:
+        fmt (str): One of FORMATS
+        columns (list): Column names
+        rows: Iterator of row tuples
+
+    Returns:
+        generator: str chunks
+    """
+    if fmt == 'csv':
+        return _encode_csv(columns, rows)
+    return _encode_jsonl(columns, rows)
@@ -0,0 +1,125 @@
+"""
+Syndication feed module.
+
+Serializes lists of entries as Atom 1.0 or RSS 2.0 documents. The output
+depends only on its arguments, so the same entries always produce the same
+bytes and a hash of the body can serve as a strong ETag.
+
+Exports:
+    FORMATS: Feed formats and their MIME types
+    FeedEntry: One item of a feed
+    render: Serialize a feed in the requested format
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.etree import ElementTree
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+FORMATS = {
+    'atom': 'application/atom+xml',
+    'rss': 'application/rss+xml',
+}
+
+# <updated> of a feed without entries; fixed so the body stays reproducible
+EPOCH = datetime(1970, 1, 1)
+
+
+class FeedEntry:
+    """
+    One item of a feed.
+
+    Attributes:
+        title (str): Entry title
+        link (str): Absolute URL of the entry's page, also used as its id
+        author (str): Author's username
+        published (datetime): Creation time, naive UTC
+        updated (datetime): Last change, naive UTC
+        content (str): Body, HTML allowed
+        category (str): Category or subject, or None
+    """
+
+    def __init__(self, title, link, author, published, updated, content, category=None):
+        self.title = title
+        self.link = link
+        self.author = author
+        self.published = published
+        self.updated = updated or published
+        self.content = content
+        self.category = category
+
+
+def _rfc3339(value):
+    return value.replace(microsecond=0).isoformat() + 'Z'
+
+
+def _rfc822(value):
+    return format_datetime(value.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True)
+
+
+def _atom(title, link, self_link, updated, entries):
+    ElementTree.register_namespace('', ATOM_NS)
+
+    def element(parent, tag, text=None, **attrs):
+        node = ElementTree.SubElement(parent, f'{{{ATOM_NS}}}{tag}', attrs)
+        node.text = text
+        return node
+
+    feed = ElementTree.Element(f'{{{ATOM_NS}}}feed')
+    element(feed, 'title', title)
+    element(feed, 'id', self_link)
+    element(feed, 'link', href=link)
+    element(feed, 'link', rel='self', href=self_link)
+    element(feed, 'updated', _rfc3339(updated))
+    for entry in entries:
+        node = element(feed, 'entry')
+        element(node, 'title', entry.title)
+        element(node, 'id', entry.link)
+        element(node, 'link', href=entry.link)
+        element(element(node, 'author'), 'name', entry.author)
+        element(node, 'published', _rfc3339(entry.published))
+        element(node, 'updated', _rfc3339(entry.updated))
+        if entry.category:
+            element(node, 'category', term=entry.category)
+        element(node, 'content', entry.content, type='html')
+    return feed
+
+
+def _rss(title, link, self_link, updated, entries):
+    rss = ElementTree.Element('rss', version='2.0')
+    channel = ElementTree.SubElement(rss, 'channel')
+    for tag, text in (('title', title), ('link', link), ('description', title),
+                      ('lastBuildDate', _rfc822(updated))):
+        ElementTree.SubElement(channel, tag).text = text
+    for entry in entries:
+        item = ElementTree.SubElement(channel, 'item')
+        ElementTree.SubElement(item, 'title').text = entry.title
+        ElementTree.SubElement(item, 'link').text = entry.link
+        ElementTree.SubElement(item, 'guid', isPermaLink='true').text = entry.link
+        ElementTree.SubElement(item, 'author').text = entry.author
+        ElementTree.SubElement(item, 'pubDate').text = _rfc822(entry.published)
+        if entry.category:
+            ElementTree.SubElement(item, 'category').text = entry.category
+        ElementTree.SubElement(item, 'description').text = entry.content
+    return rss
+
+
+def render(fmt, title, link, self_link, entries):
+    """
+    Serialize a feed.
+
+    Args:
+        fmt (str): One of FORMATS
+        title (str): Feed title
+        link (str): Absolute URL of the HTML page the feed mirrors
+        self_link (str): Absolute URL of the feed itself
+        entries (list): FeedEntry items, newest first
+
+    Returns:
+        tuple: (UTF-8 encoded document, newest entry update time or None)
+    """
+    last_modified = max((entry.updated for entry in entries), default=None)
+    build = _atom if fmt == 'atom' else _rss
+    root = build(title, link, self_link, last_modified or EPOCH, entries)
+    return ElementTree.tostring(root, encoding='utf-8', xml_declaration=True), last_modified
@@ -0,0 +1,88 @@
+"""
+Internationalization module.
+
+Sets up the application's Babel instance. A request's locale is the language
+picked with /language/<code>, else the best match for the browser's
+Accept-Language, else BABEL_DEFAULT_LOCALE. select_locale returns parsed
+Locale objects and Flask-Babel memoizes the result for the rest of the
+request, so the page cache key, the ETag and every gettext call of a request
+agree on the locale and it is resolved once.
+
+Catalogs are compiled from the ``.po`` files with
+``pybabel compile -d app/translations`` as a build step, and every compiled
+catalog is loaded when the app is created, instead of on the first request a
+worker serves in each language.
+
+Ukrainian is offered as ``ua`` in the language switcher, but its catalog
+lives under the standard locale code ``uk``.
+
+Exports:
+    LANGUAGES: Language switcher codes mapped to their locales
+    select_locale: Choose the locale of the current request
+    preload_catalogs: Load every compiled catalog into Flask-Babel's cache
+    init_app: Configure Babel, the template helpers and the catalogs
+"""
+
+import logging
+from babel import Locale
+from flask import request, session
+from flask_babel import force_locale, get_locale, get_translations
+from app import babel
+
+logger = logging.getLogger(__name__)
+
+LANGUAGES = {
+    'en': Locale.parse('en'),
+    'ua': Locale.parse('uk'),
+    'ru': Locale.parse('ru'),
+}
+
+# Accept-Language matching uses standard locale codes
+_LOCALES = {str(locale): locale for locale in LANGUAGES.values()}
+
+
+def select_locale():
+    """
+    Choose the locale of the current request.
+
+    Returns:
+        Locale: The chosen locale, or None for BABEL_DEFAULT_LOCALE
+    """
+    language = session.get('language')
+    if language in LANGUAGES:
+        return LANGUAGES[language]
+    return _LOCALES.get(request.accept_languages.best_match(_LOCALES))
+
+
+def preload_catalogs(app):
+    """
+    Load the compiled catalog of every language into Flask-Babel's cache.
+
+    Args:
+        app (Flask): Application whose translation directories are read
+
+    Returns:
+        list: Locale codes without a compiled catalog
+    """
+    missing = []
+    with app.app_context():
+        for locale in LANGUAGES.values():
+            with force_locale(locale):
+                if not get_translations().files:
+                    missing.append(str(locale))
+    if missing:
+        logger.warning('No compiled translations for %s; run "pybabel compile -d app/translations"',
+                       ', '.join(missing))
+    return missing
+
+
+def init_app(app):
+    """
+    Install the locale selector, expose the locale to templates and preload catalogs.
+
+    Args:
+        app (Flask): Application instance
+    """
+    babel.init_app(app, locale_selector=select_locale)
+    app.jinja_env.globals.update(get_locale=get_locale, languages=LANGUAGES)
+    preload_catalogs(app)
@@ -0,0 +1,318 @@
+"""
+Image storage and processing module.
+
+Uploaded images are stored once per distinct content under their SHA-256
+digest (``<digest>.<ext>`` in UPLOAD_FOLDER), so re-uploading the same picture
+or two uploads sharing a filename can no longer overwrite each other.
+
+File parts of incoming requests never go through Werkzeug's in-memory
+spooling: UploadRequest hands each part to an IngestedUpload, which writes
+chunks straight to a temporary file in UPLOAD_STAGING_FOLDER while hashing
+them, checks the magic bytes of the first chunk and enforces MAX_IMAGE_SIZE
+as the body arrives. The staging folder is not served, so bytes that were
+never validated cannot be fetched by URL; storing a validated upload is an
+atomic rename into UPLOAD_FOLDER (a copy first when the two folders are on
+different filesystems). For
+every original, resized and recompressed variants are written next to it as
+``<name>.<variant>.webp`` by a background thread pool, keeping the request
+path free of image decoding.
+
+Templates call ``image_url(filename, variant)``, which serves the variant
+once it exists and falls back to the original until then.
+
+Exports:
+    UploadRequest: Request class streaming file parts into IngestedUpload
+    IngestedUpload: Hashing, validating temporary file for one upload
+    store_upload: Save an uploaded file under its content hash and queue variants
+    schedule_variants: Queue variant generation for a stored original
+    generate_variants: Build missing variants for an original synchronously
+    image_url: URL of the best available rendition of an image
+    init_app: Register the request class, template helper and thread pool
+"""
+
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, url_for, Request
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Bounding boxes (width, height) for each variant; images are never upscaled
+VARIANTS = {
+    'thumb': (96, 96),
+    'card': (640, 640),
+    'full': (1600, 1600),
+}
+
+VARIANT_FORMAT = 'webp'
+
+# Leading bytes identifying each accepted image format, mapped to the
+# extension the stored original gets
+MAGIC_NUMBERS = {
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'\xff\xd8\xff': 'jpg',
+    b'GIF87a': 'gif',
+    b'GIF89a': 'gif',
+}
+MAGIC_LENGTH = max(len(magic) for magic in MAGIC_NUMBERS)
+
+def variant_name(filename, variant):
+    """
+    Return the file name of one variant of a stored image.
+
+    Args:
+        filename (str): Stored original, e.g. '3f2a...9c.png'
+        variant (str): One of VARIANTS
+
+    Returns:
+        str: Variant file name, e.g. '3f2a...9c.thumb.webp'
+    """
+    stem = filename.rsplit('.', 1)[0]
+    return f'{stem}.{variant}.{VARIANT_FORMAT}'
+
+
+def is_variant(filename):
+    """Return True if filename names a generated variant rather than an original."""
+    parts = filename.rsplit('.', 2)
+    return len(parts) == 3 and parts[1] in VARIANTS and parts[2] == VARIANT_FORMAT
+
+
+class IngestedUpload:
+    """
+    Writable temporary file that validates and hashes an upload as it streams in.
+
+    Werkzeug's multipart parser writes each chunk of a file part here as soon
+    as it is read from the socket, so memory use per upload stays constant.
+    Non-images are rejected once the first bytes are in and oversized files
+    as soon as they cross the limit, without reading the rest of the body.
+
+    Args:
+        folder (str): Directory the validated file is stored in
+        max_size (int): Largest accepted upload in bytes
+        staging (str): Private directory for the temporary file
+    """
+
+    def __init__(self, folder, max_size, staging):
+        self.folder = folder
+        self.max_size = max_size
+        self.size = 0
+        self.extension = None
+        self.digest = hashlib.sha256()
+        self._head = b''
+        self._committed = False
+        fd, self.path = tempfile.mkstemp(dir=staging, prefix='.upload-')
+        self._file = os.fdopen(fd, 'w+b')
+
+    def _sniff(self):
+        for magic, extension in MAGIC_NUMBERS.items():
+            if self._head.startswith(magic):
+                self.extension = extension
+                return
+        self.discard()
+        raise UnsupportedMediaType('Only PNG, JPEG and GIF images can be uploaded.')
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f'Images may be at most {self.max_size // (1024 * 1024)} MB.')
+        if self.extension is None and len(self._head) < MAGIC_LENGTH:
+            self._head += chunk[:MAGIC_LENGTH - len(self._head)]
+            if len(self._head) >= MAGIC_LENGTH:
+                self._sniff()
+        self.digest.update(chunk)
+        return self._file.write(chunk)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        # The parser rewinds once the part is complete; short files are checked here
+        if self.extension is None and self.size:
+            self._sniff()
+        return self._file.seek(offset, whence)
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def tell(self):
+        return self._file.tell()
+
+    def commit(self):
+        """
+        Move the upload into place under its content hash.
+
+        Returns:
+            str: Stored file name relative to the upload folder
+        """
+        if self.extension is None:
+            self.discard()
+            raise UnsupportedMediaType('Only PNG, JPEG and GIF images can be uploaded.')
+        self._file.close()
+        filename = f'{self.digest.hexdigest()}.{self.extension}'
+        path = os.path.join(self.folder, filename)
+        if os.path.exists(path):
+            os.remove(self.path)
+        else:
+            _move(self.path, path)
+        self._committed = True
+        return filename
+
+    def discard(self):
+        self._file.close()
+        if not self._committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # Called when the request is torn down; drops uploads that were never stored
+    close = discard
+
+
+def _move(source, path):
+    try:
+        os.replace(source, path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Staging is on another filesystem (e.g. a separate volume): copy the
+        # validated file next to its destination, then rename it into place
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as f:
+            shutil.copyfileobj(f, out, CHUNK_SIZE)
+        os.replace(tmp_path, path)
+        os.remove(source)
+
+
+class UploadRequest(Request):
+    """Request class that streams file parts into IngestedUpload."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        config = current_app.config
+        return IngestedUpload(config['UPLOAD_FOLDER'], config['MAX_IMAGE_SIZE'],
+                              config['UPLOAD_STAGING_FOLDER'])
+
+
+def store_upload(file):
+    """
+    Save an uploaded image under the SHA-256 of its content.
+
+    Uploads parsed by UploadRequest are already hashed and validated, so this
+    is an atomic rename. Any other file-like upload is streamed through an
+    IngestedUpload first. If identical content is already stored the new copy
+    is discarded and the existing file reused.
+
+    Args:
+        file (FileStorage): The uploaded file
+
+    Returns:
+        str: Stored file name relative to UPLOAD_FOLDER
+
+    Raises:
+        UnsupportedMediaType: The file is not a PNG, JPEG or GIF image
+        RequestEntityTooLarge: The file exceeds MAX_IMAGE_SIZE
+    """
+    upload = file.stream
+    if not isinstance(upload, IngestedUpload):
+        config = current_app.config
+        upload = IngestedUpload(config['UPLOAD_FOLDER'], config['MAX_IMAGE_SIZE'],
+                                config['UPLOAD_STAGING_FOLDER'])
+        for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+            upload.write(chunk)
+    filename = upload.commit()
+    schedule_variants(filename)
+    return filename
+
+
+def schedule_variants(filename):
+    """
+    Queue variant generation for a stored original on the image thread pool.
+
+    Args:
+        filename (str): Stored original relative to UPLOAD_FOLDER
+    """
+    config = current_app.config
+    current_app.extensions['image_executor'].submit(
+        _generate_logged, config['UPLOAD_FOLDER'], filename, config['IMAGE_QUALITY'])
+
+
+def _generate_logged(folder, filename, quality):
+    try:
+        generate_variants(folder, filename, quality)
+    except Exception:
+        logger.exception('Could not generate variants for %s', filename)
+
+
+def generate_variants(folder, filename, quality=80):
+    """
+    Write every missing variant of an original image.
+
+    Each variant is written to a temporary file and renamed, so a reader
+    never sees a partial image.
+
+    Args:
+        folder (str): Upload folder
+        filename (str): Stored original relative to folder
+        quality (int): WebP quality, 1-100
+
+    Returns:
+        list: Names of the variants created
+    """
+    missing = [name for name in VARIANTS
+               if not os.path.exists(os.path.join(folder, variant_name(filename, name)))]
+    if not missing:
+        return []
+
+    # Imported here so web workers only load Pillow once they process an image
+    from PIL import Image, ImageOps  # pylint: disable=import-outside-toplevel
+
+    # Image.Resampling is the home of the filters since Pillow 9.1
+    lanczos = getattr(Image, 'Resampling', Image).LANCZOS
+    created = []
+    with Image.open(os.path.join(folder, filename)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for name in missing:
+            resized = image.copy()
+            resized.thumbnail(VARIANTS[name], lanczos)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.variant-')
+            with os.fdopen(fd, 'wb') as out:
+                resized.save(out, VARIANT_FORMAT, quality=quality, method=4)
+            os.replace(tmp_path, os.path.join(folder, variant_name(filename, name)))
+            created.append(name)
+    return created
+
+
+def image_url(filename, variant='full'):
+    """
+    Return the URL for an uploaded image, preferring the requested variant.
+
+    Args:
+        filename (str): Stored original relative to UPLOAD_FOLDER
+        variant (str): One of VARIANTS
+
+    Returns:
+        str: Static URL of the variant if it has been generated, else of the original
+    """
+    name = variant_name(filename, variant)
+    if os.path.exists(os.path.join(current_app.config['UPLOAD_FOLDER'], name)):
+        return url_for('static', filename='uploads/' + name)
+    return url_for('static', filename='uploads/' + filename)
+
+
+def init_app(app):
+    """
+    Install the streaming upload request class, the image_url template helper
+    and the variant thread pool.
+
+    Args:
+        app (Flask): Application instance
+    """
+    app.request_class = UploadRequest
+    # Threads start on the first submitted image, not here
+    app.extensions['image_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix='image-variants')
+    app.jinja_env.globals['image_url'] = image_url
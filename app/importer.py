@@ -0,0 +1,397 @@
+"""
+Bulk import module.
+
+Loads users, posts, comments and news from JSONL files (one JSON object per
+line) exported from another board. The file is read a line at a time; each
+line is validated and turned into a row, and rows are inserted with Core
+executemany in batches of ``batch_size``. Every batch is committed together
+with the file's ImportCheckpoint row, so running the same import again
+after an interruption continues right after the last committed batch.
+
+References are resolved through lookup maps loaded once per run: authors
+by username, categories and roles by name, and a comment's post by id.
+Rows without an ``id`` get the next free one, which lets imported posts and
+news be indexed for search in the same transaction. Explicit ids must be
+above every id already in the table. Imports assume the site is not taking
+writes meanwhile.
+
+Record fields (``id`` is optional everywhere):
+    users: username, email, password_hash or password, role, is_admin,
+        active, bio, location, website, created_at
+    posts: title, content, author, category, created_at, updated_at
+    comments: post_id, content, author, created_at
+    news: title, content, subject, author, created_at, updated_at
+
+Exports:
+    KINDS: Importer classes by kind name
+    BatchReport: Outcome of one committed batch
+    import_jsonl: Import a file, yielding a report per batch
+"""
+
+import json
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from sqlalchemy import bindparam, func, select
+from app import db, database, passwords, search
+from app.models import (Role, User, Category, Post, Comment, News, NewsSubjectCount, UserStat,
+                        ImportCheckpoint)
+
+
+class BatchReport:
+    """
+    Outcome of one committed batch.
+
+    Attributes:
+        first_line (int): First line number covered
+        last_line (int): Last line number covered
+        imported (int): Rows inserted
+        errors (list): (line number, message) for each rejected line
+    """
+
+    def __init__(self, first_line, last_line, imported, errors):
+        self.first_line = first_line
+        self.last_line = last_line
+        self.imported = imported
+        self.errors = errors
+
+
+def _text(record, column, required=False, field=None):
+    field = field or column.name
+    value = record.get(field)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be a string')
+    length = getattr(column.type, 'length', None)
+    if length and len(value) > length:
+        raise ValueError(f'{field} is longer than {length} characters')
+    return value
+
+
+def _flag(record, field, default):
+    value = record.get(field, default)
+    if not isinstance(value, bool):
+        raise ValueError(f'{field} must be true or false')
+    return value
+
+
+def _timestamp(record, field, default):
+    value = record.get(field)
+    if value is None:
+        return default
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be an ISO 8601 string')
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{field} is not an ISO 8601 timestamp') from None
+    if parsed.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class _Importer:
+    """Validates records of one kind and turns them into rows of model."""
+
+    model = None
+
+    def __init__(self):
+        table = self.model.__table__
+        self.authors = {}
+        with db.engine.connect() as connection:
+            self.next_id = (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+            self.load(connection)
+        self.floor = self.next_id
+        self.taken = set()
+
+    def load(self, connection):
+        """Fill the lookup maps needed by prepare."""
+
+    def _authors(self, connection):
+        self.authors = dict(connection.execute(select(User.username, User.id)).all())
+
+    def _author(self, record):
+        username = _text(record, User.__table__.c.username, required=True, field='author')
+        if username not in self.authors:
+            raise ValueError(f'unknown author {username!r}')
+        return self.authors[username]
+
+    def _count_authors(self, rows, column):
+        # Bump the profile counters of the batch's authors
+        table = UserStat.__table__
+        counts = Counter(row['author_id'] for row in rows)
+        db.session.execute(
+            table.update()
+            .where(table.c.user_id == bindparam('author_id'))
+            .values({column: table.c[column] + bindparam('count'),
+                     'updated_at': datetime.utcnow()}),
+            [{'author_id': author_id, 'count': count} for author_id, count in counts.items()])
+
+    def assign_id(self, record):
+        """Return the record's id, or the next free one if it has none."""
+        row_id = record.get('id')
+        if row_id is None:
+            while self.next_id in self.taken:
+                self.next_id += 1
+            row_id = self.next_id
+            self.next_id += 1
+        elif not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise ValueError('id must be an integer')
+        elif row_id < self.floor or row_id in self.taken:
+            raise ValueError(f'id {row_id} is already in use')
+        self.taken.add(row_id)
+        return row_id
+
+    def prepare(self, record):
+        """
+        Validate a record and return the row to insert.
+
+        Raises:
+            ValueError: If the record is invalid
+        """
+        raise NotImplementedError
+
+    def after_insert(self, rows):
+        """Apply side effects of an inserted batch inside its transaction."""
+
+
+class UserImporter(_Importer):
+    model = User
+
+    def load(self, connection):
+        self.usernames = {username for username, in connection.execute(select(User.username))}
+        self.emails = {email.lower() for email, in connection.execute(select(User.email))}
+        self.roles = dict(connection.execute(select(Role.name, Role.id)).all())
+
+    def prepare(self, record):
+        table = User.__table__
+        username = _text(record, table.c.username, required=True)
+        email = _text(record, table.c.email, required=True)
+        if username in self.usernames:
+            raise ValueError(f'username {username!r} is taken')
+        if email.lower() in self.emails:
+            raise ValueError(f'email {email!r} is taken')
+        role_name = _text(record, Role.__table__.c.name, field='role') or 'User'
+        if role_name not in self.roles:
+            raise ValueError(f'unknown role {role_name!r}')
+        password_hash = _text(record, table.c.password_hash)
+        if password_hash is None and record.get('password'):
+            password_hash = passwords.hash_password(str(record['password']))
+        created_at = _timestamp(record, 'created_at', datetime.utcnow())
+        row = {
+            'id': self.assign_id(record),
+            'username': username,
+            'email': email,
+            'password_hash': password_hash,
+            'bio': _text(record, table.c.bio),
+            'avatar': None,
+            'location': _text(record, table.c.location),
+            'website': _text(record, table.c.website),
+            'newsletter_subscription': _flag(record, 'newsletter_subscription', False),
+            'created_at': created_at,
+            'updated_at': created_at,
+            'is_admin': _flag(record, 'is_admin', False),
+            'active': _flag(record, 'active', True),
+            'role_id': self.roles[role_name],
+        }
+        self.usernames.add(username)
+        self.emails.add(email.lower())
+        return row
+
+
+class PostImporter(_Importer):
+    model = Post
+
+    def load(self, connection):
+        self._authors(connection)
+        self.categories = dict(connection.execute(select(Category.name, Category.id)).all())
+
+    def prepare(self, record):
+        table = Post.__table__
+        category_id = None
+        category = _text(record, Category.__table__.c.name, field='category')
+        if category is not None:
+            if category not in self.categories:
+                raise ValueError(f'unknown category {category!r}')
+            category_id = self.categories[category]
+        created_at = _timestamp(record, 'created_at', datetime.utcnow())
+        return {
+            'id': self.assign_id(record),
+            'title': _text(record, table.c.title, required=True),
+            'content': _text(record, table.c.content, required=True),
+            'created_at': created_at,
+            'updated_at': _timestamp(record, 'updated_at', created_at),
+            'author_id': self._author(record),
+            'category_id': category_id,
+            'comment_count': 0,
+            'image_url': None,
+        }
+
+    def after_insert(self, rows):
+        search.get_backend().upsert([
+            (search.KIND_POST, row['id'], row['title'],
+             search.indexed_text(search.KIND_POST, row['content']))
+            for row in rows
+        ])
+        self._count_authors(rows, 'post_count')
+        table = Category.__table__
+        counts = Counter(row['category_id'] for row in rows if row['category_id'] is not None)
+        if counts:
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam('category_id'))
+                .values(post_count=table.c.post_count + bindparam('count'),
+                        updated_at=table.c.updated_at),
+                [{'category_id': category_id, 'count': count}
+                 for category_id, count in counts.items()])
+
+
+class CommentImporter(_Importer):
+    model = Comment
+
+    def load(self, connection):
+        self._authors(connection)
+        self.post_ids = {post_id for post_id, in connection.execute(select(Post.id))}
+
+    def prepare(self, record):
+        post_id = record.get('post_id')
+        if not isinstance(post_id, int) or isinstance(post_id, bool) or post_id not in self.post_ids:
+            raise ValueError(f'unknown post {post_id!r}')
+        created_at = _timestamp(record, 'created_at', datetime.utcnow())
+        return {
+            'id': self.assign_id(record),
+            'content': _text(record, Comment.__table__.c.content, required=True),
+            'created_at': created_at,
+            'updated_at': created_at,
+            'author_id': self._author(record),
+            'post_id': post_id,
+        }
+
+    def after_insert(self, rows):
+        table = Post.__table__
+        counts = Counter(row['post_id'] for row in rows)
+        db.session.execute(
+            table.update()
+            .where(table.c.id == bindparam('post_id'))
+            .values(comment_count=table.c.comment_count + bindparam('count'),
+                    updated_at=table.c.updated_at),
+            [{'post_id': post_id, 'count': count} for post_id, count in counts.items()])
+        self._count_authors(rows, 'comment_count')
+
+
+class NewsImporter(_Importer):
+    model = News
+
+    def load(self, connection):
+        self._authors(connection)
+
+    def prepare(self, record):
+        table = News.__table__
+        created_at = _timestamp(record, 'created_at', datetime.utcnow())
+        return {
+            'id': self.assign_id(record),
+            'title': _text(record, table.c.title, required=True),
+            'content': _text(record, table.c.content, required=True),
+            'subject': _text(record, table.c.subject, required=True),
+            'author_id': self._author(record),
+            'created_at': created_at,
+            'updated_at': _timestamp(record, 'updated_at', created_at),
+        }
+
+    def after_insert(self, rows):
+        search.get_backend().upsert([
+            (search.KIND_NEWS, row['id'], row['title'],
+             search.indexed_text(search.KIND_NEWS, row['content']))
+            for row in rows
+        ])
+        for subject, count in Counter(row['subject'] for row in rows).items():
+            NewsSubjectCount.adjust(subject, count)
+        self._count_authors(rows, 'news_count')
+
+
+KINDS = {
+    'users': UserImporter,
+    'posts': PostImporter,
+    'comments': CommentImporter,
+    'news': NewsImporter,
+}
+
+
+def import_jsonl(kind, path, batch_size=5000, restart=False):
+    """
+    Import a JSONL file, resuming where a previous run of it stopped.
+
+    Invalid lines are skipped and reported; they do not stop the import.
+    A database error rolls back the current batch and is raised, leaving
+    the checkpoint at the end of the previous batch.
+
+    Args:
+        kind (str): One of KINDS
+        path (str): JSONL file to read
+        batch_size (int): Rows inserted per transaction
+        restart (bool): Forget earlier progress and start from the first line
+
+    Yields:
+        BatchReport: After each committed batch
+
+    Raises:
+        ValueError: If the file was already imported completely
+    """
+    source = os.path.abspath(path)
+    checkpoint = db.session.get(ImportCheckpoint, (kind, source))
+    if checkpoint is not None and restart:
+        db.session.delete(checkpoint)
+        db.session.commit()
+        checkpoint = None
+    if checkpoint is None:
+        checkpoint = ImportCheckpoint(kind=kind, source=source, offset=0, line=0,
+                                      imported=0, rejected=0)
+        db.session.add(checkpoint)
+    elif checkpoint.completed_at is not None:
+        raise ValueError(f'{path} was already imported as {kind} on '
+                         f'{checkpoint.completed_at:%Y-%m-%d %H:%M}; pass restart to import it again')
+
+    importer = KINDS[kind]()
+    table = importer.model.__table__
+    offset, line = checkpoint.offset, checkpoint.line
+
+    def commit(rows, errors, first_line, done):
+        try:
+            if rows:
+                db.session.execute(table.insert(), rows)
+                importer.after_insert(rows)
+            checkpoint.offset, checkpoint.line = offset, line
+            checkpoint.imported += len(rows)
+            checkpoint.rejected += len(errors)
+            if done:
+                checkpoint.completed_at = datetime.utcnow()
+                database.sync_id_sequence(db.session.connection(), table)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return BatchReport(first_line, line, len(rows), errors)
+
+    with open(path, 'rb') as stream:
+        stream.seek(offset)
+        rows, errors, first_line = [], [], line + 1
+        for raw in stream:
+            offset += len(raw)
+            line += 1
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                if not isinstance(record, dict):
+                    raise ValueError('line is not a JSON object')
+                rows.append(importer.prepare(record))
+            except ValueError as e:
+                errors.append((line, str(e)))
+            if len(rows) >= batch_size:
+                yield commit(rows, errors, first_line, False)
+                rows, errors, first_line = [], [], line + 1
+        yield commit(rows, errors, first_line, True)
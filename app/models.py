@@ -3,8 +3,8 @@ Database models module.
 """
 from datetime import datetime
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from app import db, login_manager
+from sqlalchemy.exc import IntegrityError
+from app import db, login_manager, principals, passwords
 
 @login_manager.user_loader
 def load_user(id):
@@ -40,7 +40,7 @@ class User(UserMixin, db.Model):
     
     # New profile fields
     bio = db.Column(db.Text)
-    avatar = db.Column(db.String(20))
+    avatar = db.Column(db.String(80))
     location = db.Column(db.String(100))
     website = db.Column(db.String(200))
     newsletter_subscription = db.Column(db.Boolean, default=False)
@@ -51,25 +51,26 @@ class User(UserMixin, db.Model):
 
     is_admin = db.Column(db.Boolean, default=False)
     active = db.Column(db.Boolean, default=True)
-    role_id = db.Column(db.Integer, db.ForeignKey('role.id'))
+    role_id = db.Column(db.Integer, db.ForeignKey('role.id'), index=True)
     posts = db.relationship('Post', backref='author', lazy=True)
     comments = db.relationship('Comment', backref='author', lazy=True)
 
+    # Effective permission bits, memoized per instance by has_permission
+    _permission_mask = None
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
 
     def has_permission(self, permission):
-        # If user is admin, they have all permissions
-        if self.is_admin:
-            return True
-        # If user has no role, they have no permissions
-        if self.role is None:
-            return False
-        # Check if the user's role has the requested permission
-        return (self.role.permissions & permission) == permission
+        # Admins hold every permission and users without a role none; the
+        # mask is resolved once per instance through the principal cache
+        mask = self._permission_mask
+        if mask is None:
+            mask = self._permission_mask = principals.permission_mask(self)
+        return (mask & permission) == permission
 
     @property
     def is_authenticated(self):
@@ -113,16 +114,37 @@ class Category(db.Model):
         description (str): Optional description of the category
         created_at (datetime): Timestamp of when the category was created
         updated_at (datetime): Timestamp of when the category was last updated
+        post_count (int): Denormalized number of posts in the category
     """
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     description = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    post_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Define the relationship here only
     posts = db.relationship('Post', backref='category', lazy=True)
 
+    @classmethod
+    def adjust_post_count(cls, category_id, delta):
+        """
+        Shift a category's post counter inside the current transaction.
+
+        Like Post.adjust_comment_count, the increment is done in SQL and
+        updated_at is left alone since the category itself was not edited.
+
+        Args:
+            category_id (int): ID of the category whose counter changes, or None
+            delta (int): Amount to add (negative to subtract)
+        """
+        if category_id is None:
+            return
+        cls.query.filter_by(id=category_id).update({
+            cls.post_count: cls.post_count + delta,
+            cls.updated_at: cls.updated_at
+        }, synchronize_session=False)
+
 class Post(db.Model):
     """
     Post model for blog posts or articles.
@@ -135,6 +157,8 @@ class Post(db.Model):
         updated_at (datetime): Timestamp of when the post was last updated
         author_id (int): Foreign key to the User model
         category_id (int): Foreign key to the Category model
+        comment_count (int): Denormalized number of comments on the post
+        image_url (str): Content-addressed name of the attached image, if any
     """
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -143,10 +167,36 @@ class Post(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    image_url = db.Column(db.String(80))
     
     # Remove the category relationship since it's defined in Category model
     comments = db.relationship('Comment', backref='post', lazy=True, cascade='all, delete-orphan')
 
+    # Listings are read newest first, optionally narrowed to one category or author
+    __table_args__ = (
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_post_category_id_created_at_id', 'category_id', 'created_at', 'id'),
+        db.Index('ix_post_author_id_created_at_id', 'author_id', 'created_at', 'id'),
+    )
+
+    @classmethod
+    def adjust_comment_count(cls, post_id, delta):
+        """
+        Shift a post's comment counter inside the current transaction.
+
+        The increment is done in SQL so concurrent comments do not overwrite
+        each other, and updated_at is left alone since the post itself was not edited.
+
+        Args:
+            post_id (int): ID of the post whose counter changes
+            delta (int): Amount to add (negative to subtract)
+        """
+        cls.query.filter_by(id=post_id).update({
+            cls.comment_count: cls.comment_count + delta,
+            cls.updated_at: cls.updated_at
+        }, synchronize_session=False)
+
 class Comment(db.Model):
     """
     Comment model for post comments.
@@ -163,9 +213,14 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
 
+    # A post's comments are paged newest first
+    __table_args__ = (
+        db.Index('ix_comment_post_id_created_at_id', 'post_id', 'created_at', 'id'),
+    )
+
 # Add permissions constants
 class Permission:
     READ = 1
@@ -194,10 +249,63 @@ class Activity(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     action = db.Column(db.String(128), nullable=False)
     details = db.Column(db.String(256))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     user = db.relationship('User', backref='activities')
 
+class SiteStat(db.Model):
+    """
+    Site-wide counter shown on the admin dashboard.
+
+    Write paths adjust the counters as content is added or removed;
+    app.stats recounts them from the source tables periodically to repair drift.
+
+    Attributes:
+        name (str): Counter name, e.g. 'total_posts'
+        value (int): Current count
+        reconciled_at (datetime): When the value was last recounted
+    """
+    name = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    reconciled_at = db.Column(db.DateTime)
+
+    @classmethod
+    def adjust(cls, name, delta):
+        """
+        Shift a counter inside the current transaction.
+
+        Args:
+            name (str): Counter name
+            delta (int): Amount to add (negative to subtract)
+        """
+        cls.query.filter_by(name=name).update({cls.value: cls.value + delta},
+                                              synchronize_session=False)
+
+class ImportCheckpoint(db.Model):
+    """
+    Progress of a ``flask import`` run over one JSONL file.
+
+    Updated in the same transaction as each imported batch, so an
+    interrupted import resumes right after the last committed batch.
+
+    Attributes:
+        kind (str): What the file holds, e.g. 'posts'
+        source (str): Absolute path of the file
+        offset (int): Byte offset of the first line not yet imported
+        line (int): Number of the last line handled
+        imported (int): Rows inserted so far
+        rejected (int): Lines skipped as invalid so far
+        completed_at (datetime): When the whole file was imported
+    """
+    kind = db.Column(db.String(16), primary_key=True)
+    source = db.Column(db.String(255), primary_key=True)
+    offset = db.Column(db.BigInteger, nullable=False, default=0)
+    line = db.Column(db.Integer, nullable=False, default=0)
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class News(db.Model):
     """
     News model for storing news articles.
@@ -215,9 +323,93 @@ class News(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     subject = db.Column(db.String(100), nullable=False)
-    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    author_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationship
-    author = db.relationship('User', backref='news_articles') 
\ No newline at end of file
+    author = db.relationship('User', backref='news_articles')
+
+    # Listings are read newest first, optionally narrowed to one subject
+    __table_args__ = (
+        db.Index('ix_news_created_at_id', 'created_at', 'id'),
+        db.Index('ix_news_subject_created_at_id', 'subject', 'created_at', 'id'),
+    )
+
+class NewsSubjectCount(db.Model):
+    """
+    Number of news articles per subject, for the news facet sidebar.
+
+    news.create, news.edit and news.delete adjust the counts as articles
+    change; ``flask counters subjects`` recounts them from the news table.
+
+    Attributes:
+        subject (str): News.subject value
+        count (int): Articles with that subject
+    """
+    subject = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def adjust(cls, subject, delta):
+        """
+        Shift a subject's count inside the current transaction.
+
+        Args:
+            subject (str): News subject
+            delta (int): Amount to add (negative to subtract)
+        """
+        updated = cls.query.filter_by(subject=subject) \
+            .update({cls.count: cls.count + delta}, synchronize_session=False)
+        if not updated:
+            # First article with this subject; a concurrent request may add the row first
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(subject=subject, count=delta))
+            except IntegrityError:
+                cls.query.filter_by(subject=subject) \
+                    .update({cls.count: cls.count + delta}, synchronize_session=False)
+
+class UserStat(db.Model):
+    """
+    Content counters of one user, shown on the profile page.
+
+    The write paths adjust the counts as posts, comments and news are added
+    or removed. A user without a row is recounted when the profile is next
+    viewed (app.stats.get_user_stats), and ``flask counters users`` recounts
+    everyone.
+
+    Attributes:
+        user_id (int): The user
+        post_count (int): Posts written
+        comment_count (int): Comments written
+        news_count (int): News articles written
+        updated_at (datetime): Last change to the counts or to a listed post
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    post_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    news_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def adjust(cls, user_id, posts=0, comments=0, news=0):
+        """
+        Shift a user's counters inside the current transaction.
+
+        updated_at is always bumped, so calling it without deltas marks the
+        profile as changed, e.g. after one of the user's posts is edited.
+        Users without a row are left alone; their row is recounted later.
+
+        Args:
+            user_id (int): The user
+            posts (int): Change in posts
+            comments (int): Change in comments
+            news (int): Change in news articles
+        """
+        cls.query.filter_by(user_id=user_id).update({
+            cls.post_count: cls.post_count + posts,
+            cls.comment_count: cls.comment_count + comments,
+            cls.news_count: cls.news_count + news,
+            cls.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
@@ -0,0 +1,161 @@
+"""
+Keyset pagination module.
+
+This module provides cursor-based (keyset) pagination over a timestamp column
+with the primary key as a tie-breaker. Unlike OFFSET pagination, fetching a
+page costs the same no matter how deep into the listing the reader is.
+
+For listings that need numbered pages (filtered admin tables) it also offers
+OFFSET pagination that skips the COUNT(*) query by fetching one extra row.
+
+Exports:
+    KeysetPage: A single page of results plus the cursor for the next page
+    OffsetPage: A numbered page of results
+    encode_cursor: Serialize a (timestamp, id) pair into an opaque token
+    decode_cursor: Parse a token produced by encode_cursor
+    paginate_keyset: Apply a cursor to a query and fetch one page
+    paginate_offset: Fetch a numbered page without counting the whole result
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
+
+
+class KeysetPage:
+    """
+    A page of results returned by paginate_keyset.
+
+    Attributes:
+        items: Rows on this page, in display order
+        next_cursor: Token for the following page, or None on the last page
+    """
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class OffsetPage:
+    """
+    A numbered page of results returned by paginate_offset.
+
+    Attributes:
+        items: Rows on this page
+        page (int): 1-based page number
+        has_next (bool): Whether a following page exists
+    """
+
+    def __init__(self, items, page, has_next):
+        self.items = items
+        self.page = page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(sort_value, id_value):
+    """
+    Serialize a keyset position into a URL-safe token.
+
+    Args:
+        sort_value (datetime): Timestamp of the last row on the page
+        id_value (int): Primary key of the last row on the page
+
+    Returns:
+        str: Opaque cursor token
+    """
+    raw = f'{sort_value.isoformat()}|{id_value}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Parse a cursor token produced by encode_cursor.
+
+    Args:
+        token (str): Cursor token from the query string
+
+    Returns:
+        tuple: (datetime, int) position, or None if the token is missing or malformed
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_part, id_part = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+        return datetime.fromisoformat(sort_part), int(id_part)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def paginate_keyset(query, sort_column, id_column, cursor=None, per_page=20):
+    """
+    Fetch one page of a query ordered newest first by (sort_column, id_column).
+
+    One extra row is requested to find out whether another page exists, so the
+    whole page costs a single query.
+
+    Args:
+        query: SQLAlchemy query whose first entity owns sort_column and id_column
+        sort_column: Timestamp column to order by, e.g. Post.created_at
+        id_column: Primary key column used as tie-breaker, e.g. Post.id
+        cursor (str): Token from a previous page's next_cursor, or None for the first page
+        per_page (int): Maximum number of rows on the page
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        sort_value, id_value = position
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < id_value)
+        ))
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return KeysetPage(rows)
+
+    rows = rows[:per_page]
+    last = rows[-1][0] if isinstance(rows[-1], Row) else rows[-1]
+    next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return KeysetPage(rows, next_cursor)
+
+
+def paginate_offset(query, page=1, per_page=20):
+    """
+    Fetch a numbered page of an already ordered query.
+
+    Args:
+        query: SQLAlchemy query with its ORDER BY applied
+        page (int): 1-based page number; values below 1 are treated as 1
+        per_page (int): Maximum number of rows on the page
+
+    Returns:
+        OffsetPage: The requested page
+    """
+    page = max(page, 1)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return OffsetPage(rows[:per_page], page, len(rows) > per_page)
@@ -0,0 +1,130 @@
+"""
+Password hashing module.
+
+Hashing and verifying passwords is deliberately slow. Doing it inline let a
+burst of logins run PBKDF2 on every worker thread at once; here the work runs
+on a pool of PASSWORD_HASH_WORKERS processes per server worker. This caps
+hashing concurrency, it does not free workers: the request thread still waits
+for its hash, so a sync gunicorn worker stays busy for the whole login and a
+single login is a little slower for the round trip. What the pool buys is a
+bound: each server worker spends at most PASSWORD_HASH_WORKERS cores on
+hashing (see ``flask passwords benchmark``), excess logins queue for the
+pool, and the remaining cores keep serving pages during a burst. With
+PASSWORD_HASH_WORKERS=0 hashing runs inline, which is handy in development
+and tests.
+
+The pool is created on the first hash in each serving process, so app
+creation, CLI commands and workers that never see a login start no extra
+processes. CLI commands always hash inline. Pool processes use the
+``spawn`` start method, so they never inherit a copy of a threaded server's
+state, and a pool inherited across a fork (gunicorn ``--preload``) is
+replaced rather than used. As with any spawn pool, a script that creates the
+app and hashes at import time should guard its entry point with
+``if __name__ == '__main__'``, since pool processes re-run it.
+
+The algorithm and cost come from PASSWORD_HASH_METHOD and
+PASSWORD_SALT_LENGTH (any method accepted by Werkzeug's
+generate_password_hash). Stored hashes made under an older policy are
+detected by needs_rehash and replaced after the next successful login.
+
+Exports:
+    hash_password: Hash a password under the configured policy
+    verify_password: Check a password against a stored hash
+    needs_rehash: Whether a stored hash predates the configured policy
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import click
+from flask import current_app
+from werkzeug.security import (generate_password_hash, check_password_hash,
+                               DEFAULT_PBKDF2_ITERATIONS)
+
+_pool_lock = threading.Lock()
+
+
+def _get_pool(app):
+    # Keyed by pid: a forked worker must not use the pool of its parent,
+    # whose management thread did not survive the fork
+    pid, pool = app.extensions.get('password_pool', (None, None))
+    if pid == os.getpid():
+        return pool
+    with _pool_lock:
+        pid, pool = app.extensions.get('password_pool', (None, None))
+        if pid != os.getpid():
+            pool = ProcessPoolExecutor(max_workers=app.config['PASSWORD_HASH_WORKERS'],
+                                       mp_context=multiprocessing.get_context('spawn'))
+            atexit.register(pool.shutdown)
+            app.extensions['password_pool'] = (os.getpid(), pool)
+    return pool
+
+
+def _run(fn, *args):
+    # CLI commands (seeding, imports) run once and would only pay the start-up
+    # cost of the pool processes. A spawned pool process re-runs an unguarded
+    # entry script, and must not start a pool of its own while doing so.
+    if (not current_app.config['PASSWORD_HASH_WORKERS']
+            or click.get_current_context(silent=True) is not None
+            or multiprocessing.current_process().name != 'MainProcess'):
+        return fn(*args)
+    return _get_pool(current_app).submit(fn, *args).result()
+
+
+def _normalize_method(method):
+    # Werkzeug records the iteration count even when the method omits it
+    parts = method.split(':')
+    if parts[0] == 'pbkdf2' and len(parts) == 2:
+        parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ':'.join(parts)
+
+
+def hash_password(password):
+    """
+    Hash a password under the configured policy.
+
+    Args:
+        password (str): Plain-text password
+
+    Returns:
+        str: Hash in Werkzeug's ``method$salt$hash`` format
+    """
+    config = current_app.config
+    return _run(generate_password_hash, password,
+                config['PASSWORD_HASH_METHOD'], config['PASSWORD_SALT_LENGTH'])
+
+
+def verify_password(pwhash, password):
+    """
+    Check a password against a stored hash.
+
+    Args:
+        pwhash (str): Stored hash
+        password (str): Plain-text password to check
+
+    Returns:
+        bool: True if the password matches
+    """
+    if not pwhash:
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """
+    Tell whether a stored hash was made under a different policy.
+
+    Args:
+        pwhash (str): Stored hash
+
+    Returns:
+        bool: True if the method, cost or salt length differ from the configuration
+    """
+    if not pwhash or pwhash.count('$') < 2:
+        return True
+    method, salt, _ = pwhash.split('$', 2)
+    config = current_app.config
+    return (method != _normalize_method(config['PASSWORD_HASH_METHOD'])
+            or len(salt) != config['PASSWORD_SALT_LENGTH'])
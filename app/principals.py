@@ -0,0 +1,79 @@
+"""
+Principal cache module.
+
+Flask-Login resolves current_user once per request, but every permission
+check on it used to load the user's role. This module computes a user's
+effective permission bitmask once and keeps it in a small in-process LRU
+keyed by user id, so most requests never touch the role table. Within a
+request the mask is also memoized on the User instance itself.
+
+Entries live for PRINCIPAL_CACHE_TIMEOUT seconds. Admin views that change a
+user's role or status, or a role's permissions, invalidate the affected
+entries after committing; other worker processes pick the change up once
+their entry expires, so keep the timeout short.
+
+Exports:
+    PrincipalCache: Flask extension holding the permission masks
+    ALL_PERMISSIONS: Mask granted to administrators
+"""
+
+from app.cache import LRUCache, NullCache
+
+# Every bit set, so admins also hold permissions added later
+ALL_PERMISSIONS = ~0
+
+
+class PrincipalCache:
+    """Bounded, short-lived cache of effective permission masks by user id."""
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create the backing LRU from PRINCIPAL_CACHE_MAX_ENTRIES and PRINCIPAL_CACHE_TIMEOUT.
+
+        Args:
+            app (Flask): Application to read configuration from
+        """
+        self.backend = LRUCache(app.config['PRINCIPAL_CACHE_MAX_ENTRIES'],
+                                app.config['PRINCIPAL_CACHE_TIMEOUT'])
+        app.extensions['principal_cache'] = self
+
+    def permission_mask(self, user):
+        """
+        Return the effective permission bits of a user.
+
+        Args:
+            user (User): The user to resolve
+
+        Returns:
+            int: ALL_PERMISSIONS for admins, the role's permissions otherwise
+        """
+        # Before init_app the backend is a NullCache, whose get is always None
+        mask = self.backend.get(user.id)  # pylint: disable=assignment-from-none
+        if mask is None:
+            if user.is_admin:
+                mask = ALL_PERMISSIONS
+            elif user.role is not None:
+                mask = user.role.permissions or 0
+            else:
+                mask = 0
+            self.backend.set(user.id, mask)
+        return mask
+
+    def invalidate(self, *user_ids):
+        """
+        Drop the cached masks of the given users.
+
+        Args:
+            *user_ids (int): Ids of users whose role, admin flag or status changed
+        """
+        for user_id in user_ids:
+            self.backend.delete(user_id)
+
+    def clear(self):
+        """Drop every cached mask, e.g. after a role's permissions changed."""
+        self.backend.clear()
@@ -0,0 +1,189 @@
+"""
+SQL profiler module.
+
+Opt-in instrumentation (SQL_PROFILER_ENABLED) that times every statement a
+request sends to the database through SQLAlchemy engine events. For each
+request it records the query count, total database time and the slowest
+statements, and flags N+1 patterns: the same SQL run at least
+SQL_PROFILER_REPEAT_THRESHOLD times with different parameters, which is
+what lazy loading a relationship inside a loop looks like.
+
+Results are reported three ways:
+    - X-SQL-Queries, X-SQL-Time-Ms and X-SQL-Repeated response headers
+    - One JSON log line per request on the ``app.profiler`` logger
+    - Per-endpoint totals shown on the /admin/sql page
+
+Exports:
+    SQLProfiler: Flask extension collecting the measurements
+"""
+
+import json
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    """Statements executed while handling one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.statements = {}
+
+    def add(self, statement, parameters, duration):
+        self.count += 1
+        self.total += duration
+        entry = self.statements.setdefault(statement, {'count': 0, 'time': 0.0,
+                                                       'slowest': 0.0, 'parameters': set()})
+        entry['count'] += 1
+        entry['time'] += duration
+        entry['slowest'] = max(entry['slowest'], duration)
+        entry['parameters'].add(repr(parameters))
+
+    def repeated(self, threshold):
+        """Statements run at least threshold times with different parameters."""
+        return {statement: entry['count'] for statement, entry in self.statements.items()
+                if len(entry['parameters']) >= threshold}
+
+    def slowest(self, limit):
+        ranked = sorted(self.statements.items(), key=lambda item: item[1]['slowest'], reverse=True)
+        return [(statement, entry['slowest']) for statement, entry in ranked[:limit]]
+
+
+class SQLProfiler:
+    """Flask extension timing SQL per request and aggregating it per endpoint."""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.endpoints = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Hook the engines and request cycle when SQL_PROFILER_ENABLED is set.
+
+        Must be called inside an application context, after the replica
+        router, so replica engines are profiled too.
+
+        Args:
+            app (Flask): Application instance
+        """
+        app.extensions['sql_profiler'] = self
+        self.enabled = app.config['SQL_PROFILER_ENABLED']
+        if not self.enabled:
+            return
+        self.slow_count = app.config['SQL_PROFILER_SLOW_COUNT']
+        self.repeat_threshold = app.config['SQL_PROFILER_REPEAT_THRESHOLD']
+
+        engines = [app.extensions['sqlalchemy'].engine]
+        router = app.extensions.get('replica_router')
+        if router is not None:
+            engines += [replica.engine for replica in router.replicas]
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_execute)
+            event.listen(engine, 'handle_error', self._on_error)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['profiler_start'].pop()
+        if has_request_context() and 'sql_profile' in g:
+            g.sql_profile.add(statement, parameters, time.perf_counter() - started)
+
+    def _on_error(self, context):
+        if context.connection is not None:
+            starts = context.connection.info.get('profiler_start')
+            if starts:
+                starts.pop()
+
+    def _start_request(self):
+        g.sql_profile = RequestProfile()
+
+    def _finish_request(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+        repeated = profile.repeated(self.repeat_threshold)
+        slowest = profile.slowest(self.slow_count)
+        endpoint = request.endpoint or request.path
+
+        response.headers['X-SQL-Queries'] = str(profile.count)
+        response.headers['X-SQL-Time-Ms'] = f'{profile.total * 1000:.2f}'
+        response.headers['X-SQL-Repeated'] = str(len(repeated))
+        logger.info(json.dumps({
+            'event': 'sql_profile',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'queries': profile.count,
+            'db_ms': round(profile.total * 1000, 2),
+            'repeated': [{'sql': _shorten(sql), 'count': count} for sql, count in repeated.items()],
+            'slowest': [{'sql': _shorten(sql), 'ms': round(duration * 1000, 2)}
+                        for sql, duration in slowest],
+        }))
+        self._aggregate(endpoint, profile, repeated, slowest)
+        return response
+
+    def _aggregate(self, endpoint, profile, repeated, slowest):
+        with self._lock:
+            totals = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_time': 0.0,
+                'repeated_requests': 0, 'slowest_sql': None, 'slowest_time': 0.0,
+            })
+            totals['requests'] += 1
+            totals['queries'] += profile.count
+            totals['max_queries'] = max(totals['max_queries'], profile.count)
+            totals['db_time'] += profile.total
+            totals['repeated_requests'] += bool(repeated)
+            if slowest and slowest[0][1] > totals['slowest_time']:
+                totals['slowest_sql'], totals['slowest_time'] = slowest[0]
+
+    def worst_endpoints(self, limit=50):
+        """
+        Return per-endpoint totals, worst first.
+
+        Endpoints are ranked by average database time per request.
+
+        Args:
+            limit (int): Maximum number of endpoints returned
+
+        Returns:
+            list: Dicts with endpoint, requests, avg_queries, max_queries,
+                avg_db_ms, repeated_requests, slowest_sql and slowest_ms
+        """
+        with self._lock:
+            rows = [{
+                'endpoint': endpoint,
+                'requests': totals['requests'],
+                'avg_queries': round(totals['queries'] / totals['requests'], 1),
+                'max_queries': totals['max_queries'],
+                'avg_db_ms': round(totals['db_time'] * 1000 / totals['requests'], 2),
+                'repeated_requests': totals['repeated_requests'],
+                'slowest_sql': _shorten(totals['slowest_sql']) if totals['slowest_sql'] else None,
+                'slowest_ms': round(totals['slowest_time'] * 1000, 2),
+            } for endpoint, totals in self.endpoints.items()]
+        rows.sort(key=lambda row: row['avg_db_ms'], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        """Forget the per-endpoint totals."""
+        with self._lock:
+            self.endpoints.clear()
+
+
+def _shorten(sql, length=300):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= length else sql[:length] + '...'
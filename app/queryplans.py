@@ -0,0 +1,176 @@
+"""
+Query plan checks module.
+
+This module guards the listing indexes against regressions. It requests a
+set of representative pages through the test client, records every SELECT
+the routes issue, and runs each one through the database's EXPLAIN. A query
+that reads a whole table, or sorts rows it could have read in index order,
+is reported as a full scan.
+
+Supported databases are SQLite (EXPLAIN QUERY PLAN), PostgreSQL (EXPLAIN
+with sequential scans disabled, so the planner shows whether an index could
+serve the query even on a small table) and MySQL (EXPLAIN, where access type
+ALL is a full scan). MySQL has no switch to discourage table scans, so check
+it against a seeded database; on a near-empty one the optimizer may scan.
+
+Exports:
+    sample_urls: Pages to check, built from rows in the database
+    capture_queries: Request pages and record the SELECTs they run
+    DIALECTS: Databases whose plans can be checked
+    explain: Return the plan lines of one recorded query
+    full_scans: Plan lines that indicate a full scan
+"""
+
+from urllib.parse import quote
+from flask import g
+from sqlalchemy import event
+from app import db, cache
+from app.cache import NullCache
+from app.models import Post, News, User
+from app.pagination import encode_cursor
+
+# Tables small enough that reading all of them is expected
+SMALL_TABLES = {'category', 'role', 'site_stat'}
+
+# Dialects explain knows how to read plans from
+DIALECTS = ('sqlite', 'postgresql', 'mysql')
+
+
+def sample_urls():
+    """
+    Build the list of pages to check from existing rows.
+
+    Returns:
+        list: (url, as_admin) pairs; as_admin pages are requested logged in
+    """
+    urls = [('/', False), ('/news/', False), ('/search/?q=test', False),
+            ('/feeds/posts.atom', False), ('/feeds/news.rss', False),
+            ('/admin/', True), ('/admin/?q=a&status=active', True),
+            ('/admin/categories', True)]
+    post = Post.query.order_by(Post.id).first()
+    if post is not None:
+        cursor = encode_cursor(post.created_at, post.id)
+        if post.category_id is not None:
+            urls += [(f'/feeds/category/{post.category_id}.atom', False),
+                     (f'/category/{post.category_id}', False),
+                     (f'/category/{post.category_id}?cursor={cursor}', False)]
+        urls += [(f'/?cursor={cursor}', False), (f'/post/{post.id}', False),
+                 (f'/post/{post.id}/comments?cursor={cursor}', False)]
+    news = News.query.order_by(News.id).first()
+    if news is not None:
+        urls += [(f'/news/{news.id}', False), (f'/news/?subject={quote(news.subject)}', False)]
+    user = User.query.order_by(User.id).first()
+    if user is not None:
+        urls.append((f'/profile/{user.username}', False))
+    return urls
+
+
+def capture_queries(app, urls):
+    """
+    Request each page and record the SELECT statements it runs.
+
+    The page cache is bypassed so every route actually queries.
+
+    Args:
+        app (Flask): Application to request pages from
+        urls (list): (url, as_admin) pairs as returned by sample_urls
+
+    Returns:
+        list: (url, statement, parameters) tuples, one per distinct statement
+    """
+    admin = User.query.filter_by(is_admin=True).order_by(User.id).first()
+    captured = []
+    seen = set()
+    current_url = None
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and statement not in seen:
+            seen.add(statement)
+            captured.append((current_url, statement, parameters))
+
+    backend, cache.backend = cache.backend, NullCache()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        for url, as_admin in urls:
+            client = app.test_client()
+            if as_admin:
+                if admin is None:
+                    continue
+                with client.session_transaction() as session:
+                    session['_user_id'] = str(admin.id)
+                    session['_fresh'] = True
+            current_url = url
+            # Requests share the caller's app context, so drop the user
+            # Flask-Login cached on g for the previous page
+            g.pop('_login_user', None)
+            client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        cache.backend = backend
+    return captured
+
+
+def explain(connection, statement, parameters):
+    """
+    Return the query plan of a recorded statement.
+
+    Args:
+        connection: SQLAlchemy connection to the same database
+        statement (str): SQL as sent to the driver
+        parameters: Driver parameters recorded with the statement
+
+    Returns:
+        list: Plan lines as strings
+
+    Raises:
+        ValueError: If the dialect is not one of DIALECTS
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        return [row[-1] for row in rows]
+    if dialect == 'postgresql':
+        connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        return [row[0] for row in rows]
+    if dialect == 'mysql':
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings()
+        return [f"MySQL table={row['table']} type={row['type']} key={row['key']} "
+                f"extra={row['Extra'] or ''}" for row in rows]
+    raise ValueError(f'Query plan checks do not support {dialect}')
+
+
+def full_scans(plan):
+    """
+    Pick the plan lines that indicate a full scan or an avoidable sort.
+
+    Args:
+        plan (list): Plan lines as returned by explain
+
+    Returns:
+        list: Offending lines; empty if the plan only uses indexes
+    """
+    offending = []
+    # Full-text matches come back ranked, which always needs a sort
+    ranked = any('VIRTUAL TABLE' in line or ' type=fulltext ' in line for line in plan)
+    for line in plan:
+        text = line.strip()
+        if text.startswith('SCAN '):
+            # SQLite: 'SCAN post' reads the table, 'SCAN post USING INDEX ...' does not
+            table = text.split()[1]
+            if table not in SMALL_TABLES and ' USING ' not in text and 'VIRTUAL TABLE' not in text:
+                offending.append(text)
+        elif text.startswith('USE TEMP B-TREE FOR ORDER BY') and not ranked:
+            offending.append(text)
+        elif 'Seq Scan on ' in text:
+            table = text.split('Seq Scan on ', 1)[1].split()[0].strip('"')
+            if table not in SMALL_TABLES:
+                offending.append(text)
+        elif text.startswith('MySQL table='):
+            # MySQL: one row per table; access type ALL reads the whole table
+            table = text.split()[1].split('=', 1)[1]
+            if ' type=ALL ' in text and table not in SMALL_TABLES:
+                offending.append(text)
+            elif 'Using filesort' in text and not ranked:
+                offending.append(text)
+    return offending
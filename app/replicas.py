@@ -0,0 +1,144 @@
+"""
+Read replica routing module.
+
+When SQLALCHEMY_REPLICA_URIS lists one or more replicas, SELECTs issued while
+handling GET and HEAD requests are sent to a replica, picked round-robin
+among the healthy ones. Everything else goes to the primary: writes,
+flushes, raw SQL, reads outside a request (CLI commands, background
+threads) and requests of any other method.
+
+After a POST (or a GET that wrote) the client reads from the primary for
+READ_YOUR_WRITES_SECONDS, so the redirect that follows shows the change
+even if the replicas lag behind. The deadline is kept in the Flask session.
+
+A replica that fails a query with a disconnect error, or fails the
+``SELECT 1`` health check run every REPLICA_HEALTH_CHECK_INTERVAL seconds,
+is skipped until a later check succeeds. With no healthy replica all
+reads go to the primary.
+
+Exports:
+    RoutingSession: Session class choosing the primary or a replica per statement
+    ReplicaRouter: Flask extension owning the replica engines
+"""
+
+import itertools
+import logging
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+from app import database
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = time.monotonic()
+
+
+class ReplicaRouter:
+    """Flask extension holding replica engines and choosing one per read."""
+
+    def __init__(self, app=None):
+        self.replicas = []
+        self._counter = itertools.count()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Create an engine for each URI in SQLALCHEMY_REPLICA_URIS.
+
+        Must be called inside an application context.
+
+        Args:
+            app (Flask): Application to read configuration from
+        """
+        self.health_check_interval = app.config['REPLICA_HEALTH_CHECK_INTERVAL']
+        self.sticky_seconds = app.config['READ_YOUR_WRITES_SECONDS']
+        self.replicas = []
+        for uri in app.config['SQLALCHEMY_REPLICA_URIS']:
+            engine = create_engine(uri, **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+            database.tune_engine(engine, app.config)
+            replica = _Replica(engine)
+            event.listen(engine, 'handle_error', self._error_handler(replica))
+            self.replicas.append(replica)
+        if self.replicas:
+            app.after_request(self._remember_write)
+        app.extensions['replica_router'] = self
+
+    def _error_handler(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                logger.warning('Replica %s disconnected, skipping it', replica.engine.url)
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+        return handle_error
+
+    def _check(self, replica):
+        replica.checked_at = time.monotonic()
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception:
+            if replica.healthy:
+                logger.warning('Replica %s failed its health check', replica.engine.url)
+            replica.healthy = False
+        else:
+            replica.healthy = True
+
+    def pick(self):
+        """
+        Return the engine of the next healthy replica.
+
+        Returns:
+            Engine: A replica engine, or None if no replica is usable
+        """
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._counter) % len(self.replicas)]
+            if now - replica.checked_at >= self.health_check_interval:
+                self._check(replica)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def reads_from_replica(self):
+        """Whether reads in the current request may be served by a replica."""
+        return (bool(self.replicas)
+                and has_request_context()
+                and request.method in ('GET', 'HEAD')
+                and not g.get('wrote_to_primary')
+                and session.get('primary_until', 0) < time.time())
+
+    def _remember_write(self, response):
+        if g.get('wrote_to_primary') or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            session['primary_until'] = time.time() + self.sticky_seconds
+        return response
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs in GET requests to a replica.
+
+    Once the session flushes or runs an INSERT, UPDATE or DELETE during a
+    request, every later statement of that request goes to the primary.
+    Raw SQL and bare connections always use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            router = current_app.extensions.get('replica_router')
+            if router is not None and router.replicas:
+                if self._flushing or isinstance(clause, UpdateBase):
+                    g.wrote_to_primary = True
+                elif isinstance(clause, Select) and router.reads_from_replica():
+                    engine = router.pick()
+                    if engine is not None:
+                        return engine
+        return super().get_bind(mapper, clause, bind=bind, **kwargs)
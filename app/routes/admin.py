@@ -6,17 +6,26 @@ content moderation, and site settings. Access is restricted to users
 with admin privileges.
 
 Routes:
-    - /admin: Admin dashboard
+    - /admin: Admin dashboard with a searchable, paginated user table
     - /admin/users: User management
     - /admin/posts: Post management
     - /admin/categories: Category management
     - /admin/settings: Site settings
+    - /admin/cache: Page cache statistics
+    - /admin/sql: Endpoints ranked by SQL profiler measurements
+    - /admin/export: Streamed CSV or JSONL export of posts, comments, users or activity
 """
 
+from datetime import date
 from functools import wraps
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, \
+    Response, stream_with_context
 from flask_login import login_required, current_user
-from app.models import Category, User, Post, Comment, db, Role, Permission, Activity
+from sqlalchemy.orm import joinedload
+from app.models import Category, User, db, Role, Permission, Activity, SiteStat
+from app import cache, principals, audit, profiler, exports
+from app.pagination import paginate_offset
+from app.stats import get_site_stats
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -36,27 +45,117 @@ def dashboard():
     """
     Display admin dashboard.
 
+    Query parameters filter the user table: ``q`` matches a username or
+    email prefix, ``role`` a role id and ``status`` is 'active' or
+    'inactive'. ``page`` selects the page of ADMIN_USERS_PER_PAGE users.
+
     Returns:
         rendered_template: Admin dashboard with overview statistics
     """
-    # Get statistics
-    stats = {
-        'total_users': User.query.count(),
-        'total_posts': Post.query.count(),
-        'total_categories': Category.query.count(),
-        'total_comments': Comment.query.count()
-    }
+    # Counters are maintained by the write paths, see app.stats
+    stats = get_site_stats()
 
     # Get recent activities
-    recent_activities = Activity.query.order_by(Activity.timestamp.desc()).limit(10).all()
+    recent_activities = Activity.query \
+        .options(joinedload(Activity.user)) \
+        .order_by(Activity.timestamp.desc()) \
+        .limit(10) \
+        .all()
 
-    # Get all users
-    users = User.query.all()
+    # Filtered page of users, roles loaded in the same query
+    filters = {
+        'q': request.args.get('q', '').strip(),
+        'role': request.args.get('role', type=int),
+        'status': request.args.get('status', ''),
+    }
+    query = User.query.options(joinedload(User.role))
+    if filters['q']:
+        query = query.filter(db.or_(
+            User.username.startswith(filters['q'], autoescape=True),
+            User.email.startswith(filters['q'], autoescape=True)
+        ))
+    if filters['role']:
+        query = query.filter(User.role_id == filters['role'])
+    if filters['status'] in ('active', 'inactive'):
+        query = query.filter(User.active == (filters['status'] == 'active'))
+    users = paginate_offset(query.order_by(User.username, User.id),
+                            request.args.get('page', 1, type=int),
+                            current_app.config['ADMIN_USERS_PER_PAGE'])
 
     return render_template('admin/dashboard.html', 
                          stats=stats,
                          recent_activities=recent_activities,
-                         users=users)
+                         users=users,
+                         roles=Role.query.order_by(Role.name).all(),
+                         filters=filters)
+
+@bp.route('/cache')
+@login_required
+@admin_required
+def cache_stats():
+    """
+    Report page cache counters for this worker process.
+
+    Returns:
+        JSON: Backend name, entry count, hits, misses, hit ratio and invalidations
+    """
+    return jsonify(cache.stats())
+
+@bp.route('/sql', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def sql_profile():
+    """
+    List endpoints by average database time per request.
+
+    Totals are collected by this worker process while SQL_PROFILER_ENABLED
+    is set; POST clears them.
+
+    Returns:
+        rendered_template: Table of the worst endpoints
+    """
+    if request.method == 'POST':
+        profiler.reset()
+        flash('Profiler totals cleared')
+        return redirect(url_for('admin.sql_profile'))
+    return render_template('admin/sql_profile.html',
+                         enabled=profiler.enabled,
+                         endpoints=profiler.worst_endpoints())
+
+@bp.route('/export')
+@login_required
+@admin_required
+def export():
+    """
+    Stream an export as a file download.
+
+    Query parameters: ``kind`` (posts, comments, users or activity),
+    ``format`` (csv or jsonl) and the optional filters ``since`` and
+    ``until`` (YYYY-MM-DD, inclusive), ``category`` and ``author``.
+
+    Returns:
+        Response: Streamed file, or a redirect to the dashboard on bad parameters
+    """
+    kind = request.args.get('kind', 'posts')
+    fmt = request.args.get('format', 'csv')
+    try:
+        if fmt not in exports.FORMATS:
+            raise ValueError(f'Unknown format {fmt!r}')
+        filters = exports.parse_filters(kind,
+                                        since=request.args.get('since'),
+                                        until=request.args.get('until'),
+                                        category=request.args.get('category', '').strip(),
+                                        author=request.args.get('author', '').strip())
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('admin.dashboard'))
+
+    columns, rows = exports.export_rows(kind, filters)
+    audit.record('Export', f'{kind} as {fmt}')
+    return Response(stream_with_context(exports.encode(fmt, columns, rows)),
+                    mimetype=exports.FORMATS[fmt],
+                    headers={'Content-Disposition':
+                             f'attachment; filename={kind}-{date.today()}.{fmt}'})
 
 @bp.route('/categories', methods=['GET', 'POST'])
 @login_required
@@ -67,7 +166,9 @@ def categories():
         if name:
             category = Category(name=name)
             db.session.add(category)
+            SiteStat.adjust('total_categories', 1)
             db.session.commit()
+            cache.invalidate('categories')
             flash('Category added successfully')
     categories = Category.query.all()
     return render_template('admin/categories.html', categories=categories)
@@ -80,6 +181,7 @@ def edit_category(id):
     if request.method == 'POST':
         category.name = request.form.get('name')
         db.session.commit()
+        cache.invalidate('categories')
         flash('Category updated successfully')
         return redirect(url_for('admin.categories'))
     return render_template('admin/edit_category.html', category=category)
@@ -89,8 +191,13 @@ def edit_category(id):
 @admin_required
 def delete_category(id):
     category = Category.query.get_or_404(id)
+    if category.post_count:
+        flash('Only categories without posts can be deleted')
+        return redirect(url_for('admin.categories'))
     db.session.delete(category)
+    SiteStat.adjust('total_categories', -1)
     db.session.commit()
+    cache.invalidate('categories')
     flash('Category deleted successfully')
     return redirect(url_for('admin.categories'))
 
@@ -124,16 +231,9 @@ def edit_role(id):
         for perm in request.form.getlist('permissions'):
             role.permissions |= int(perm)
         
+        audit.record('Edit role', f'Updated role: {role.name}')
         db.session.commit()
-        
-        # Log the activity
-        activity = Activity(
-            user_id=current_user.id,
-            action='Edit role',
-            details=f'Updated role: {role.name}'
-        )
-        db.session.add(activity)
-        db.session.commit()
+        principals.clear()
         
         flash('Role updated successfully')
         return redirect(url_for('admin.manage_roles'))
@@ -151,15 +251,8 @@ def delete_role(id):
         flash('Cannot delete role with assigned users')
         return redirect(url_for('admin.manage_roles'))
     
-    # Log the activity
-    activity = Activity(
-        user_id=current_user.id,
-        action='Delete role',
-        details=f'Deleted role: {role.name}'
-    )
-    
+    audit.record('Delete role', f'Deleted role: {role.name}')
     db.session.delete(role)
-    db.session.add(activity)
     db.session.commit()
     
     flash('Role deleted successfully')
@@ -185,6 +278,9 @@ def edit_user(id):
         user.role_id = role_id
         
         db.session.commit()
+        principals.invalidate(user.id)
+        # Cached pages show usernames next to posts, comments and news
+        cache.invalidate('users')
         flash('User updated successfully')
         return redirect(url_for('admin.dashboard'))
     
@@ -200,19 +296,12 @@ def toggle_user_status(id):
         flash('You cannot deactivate your own account')
         return redirect(url_for('admin.dashboard'))
     
-    user.is_active = not user.is_active
+    user.active = not user.active
+    status = 'activated' if user.is_active else 'deactivated'
+    audit.record('Toggle user status', f'Changed {user.username} status to {status}')
     db.session.commit()
+    principals.invalidate(user.id)
     
-    status = 'activated' if user.is_active else 'deactivated'
     flash(f'User {user.username} has been {status}')
     
-    # Log the activity
-    activity = Activity(
-        user_id=current_user.id,
-        action=f'Toggle user status',
-        details=f'Changed {user.username} status to {status}'
-    )
-    db.session.add(activity)
-    db.session.commit()
-    
     return redirect(url_for('admin.dashboard')) 
\ No newline at end of file
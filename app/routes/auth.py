@@ -14,7 +14,8 @@ Routes:
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from app.models import User, db
+from app.models import User, SiteStat, db
+from app import passwords
 
 bp = Blueprint('auth', __name__)
 
@@ -32,6 +33,7 @@ def register():
         user = User(username=username, email=email)
         user.set_password(password)
         db.session.add(user)
+        SiteStat.adjust('total_users', 1)
         db.session.commit()
 
         return redirect(url_for('auth.login'))
@@ -51,6 +53,10 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         if user and user.check_password(password):
+            # Upgrade hashes made under an older policy while the password is at hand
+            if passwords.needs_rehash(user.password_hash):
+                user.set_password(password)
+                db.session.commit()
             login_user(user)
             return redirect(url_for('main.index'))
         flash('Invalid username or password')
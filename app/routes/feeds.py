@@ -0,0 +1,117 @@
+"""
+Feed routes module.
+
+Atom and RSS feeds of the newest posts, news and posts per category. Each
+feed is built from the FEED_ENTRIES newest rows with one indexed query.
+The serialized document is kept in the page cache under the request's
+locale (feed titles are translated) and the current version of the cache
+tags it depends on, so it is only rebuilt after a write invalidates one of
+those tags. Responses carry a strong ETag (a hash
+of the document) and Last-Modified, so polls of an unchanged feed get a
+304 without touching the database.
+
+Routes:
+    - /feeds/posts.atom, /feeds/posts.rss: Newest posts
+    - /feeds/news.atom, /feeds/news.rss: Newest news articles
+    - /feeds/category/<id>.atom, /feeds/category/<id>.rss: Newest posts in a category
+"""
+
+import hashlib
+from flask import Blueprint, current_app, request, url_for, abort
+from flask_babel import get_locale, gettext
+from sqlalchemy.orm import joinedload
+from werkzeug.http import is_resource_modified
+from app import cache, feeds
+from app.models import Category, News, Post
+
+bp = Blueprint('feeds', __name__, url_prefix='/feeds')
+
+
+def _post_entries(query):
+    posts = query.options(joinedload(Post.author), joinedload(Post.category)) \
+        .order_by(Post.created_at.desc(), Post.id.desc()) \
+        .limit(current_app.config['FEED_ENTRIES']) \
+        .all()
+    return [feeds.FeedEntry(post.title, url_for('main.post', post_id=post.id, _external=True),
+                            post.author.username, post.created_at, post.updated_at,
+                            post.content, post.category.name if post.category else None)
+            for post in posts]
+
+
+def _serve(name, fmt, tags, build):
+    """
+    Answer a feed request from the cached document, building it on a miss.
+
+    Args:
+        name (str): Feed name, unique per feed
+        fmt (str): One of feeds.FORMATS
+        tags (list): Page cache tags whose invalidation makes the feed stale
+        build (callable): Returns (title, link, entries) for the feed
+
+    Returns:
+        Response: The feed, or 304 Not Modified
+    """
+    key = f'feed:{name}:{fmt}:{get_locale()}:{cache.versions(*tags)}'
+    entry = cache.backend.get(key)
+    if entry is None:
+        title, link, entries = build()
+        body, last_modified = feeds.render(fmt, title, link, request.base_url, entries)
+        entry = (hashlib.sha1(body).hexdigest(), last_modified, body)
+        cache.backend.set(key, entry)
+    etag, last_modified, body = entry
+
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = current_app.response_class(body, mimetype=feeds.FORMATS[fmt])
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Same document for every reader; clients revalidate on each poll
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    # The title follows the reader's language
+    response.vary.add('Cookie')
+    response.vary.add('Accept-Language')
+    return response
+
+
+@bp.route('/posts.<any(atom, rss):fmt>')
+def posts(fmt):
+    """Feed of the newest posts."""
+    def build():
+        return (gettext('%(site)s: Posts', site=current_app.config['FEED_TITLE']),
+                url_for('main.index', _external=True),
+                _post_entries(Post.query))
+    return _serve('posts', fmt, ['posts', 'categories', 'users'], build)
+
+
+@bp.route('/news.<any(atom, rss):fmt>')
+def news(fmt):
+    """Feed of the newest news articles."""
+    def build():
+        articles = News.query.options(joinedload(News.author)) \
+            .order_by(News.created_at.desc(), News.id.desc()) \
+            .limit(current_app.config['FEED_ENTRIES']) \
+            .all()
+        entries = [feeds.FeedEntry(article.title,
+                                   url_for('news.view', news_id=article.id, _external=True),
+                                   article.author.username, article.created_at,
+                                   article.updated_at, article.content, article.subject)
+                   for article in articles]
+        return (gettext('%(site)s: News', site=current_app.config['FEED_TITLE']),
+                url_for('news.index', _external=True), entries)
+    return _serve('news', fmt, ['news', 'users'], build)
+
+
+@bp.route('/category/<int:category_id>.<any(atom, rss):fmt>')
+def category(category_id, fmt):
+    """Feed of the newest posts in one category."""
+    def build():
+        category = Category.query.get(category_id)
+        if category is None:
+            abort(404)
+        return (f"{current_app.config['FEED_TITLE']}: {category.name}",
+                url_for('main.category', category_id=category_id, _external=True),
+                _post_entries(Post.query.filter(Post.category_id == category_id)))
+    return _serve(f'category:{category_id}', fmt, ['posts', 'categories', 'users'], build)
@@ -8,52 +8,178 @@ editing, and deletion.
 Routes:
     - /: Home page
     - /posts: List all posts
+    - /category/<id>: Posts in one category
     - /post/<id>: View specific post
+    - /post/<id>/comments: Load a page of comments as JSON
     - /post/create: Create new post
     - /post/<id>/edit: Edit existing post
     - /post/<id>/delete: Delete post
 """
 
-import os
-from werkzeug.utils import secure_filename
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, session
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, session, jsonify, abort
 from flask_login import login_required, current_user
-from app.models import Post, Comment, Category, Permission
-from app import db
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app.models import Post, Comment, Category, Permission, User, SiteStat, UserStat
+from app import db, search, cache, images, i18n
+from app.conditional import conditional
+from app.pagination import paginate_keyset
 
 
 bp = Blueprint('main', __name__)
 
 @bp.route('/')
+@cache.cached(tags=lambda: ['posts', 'categories', 'users'])
 def index():
     """
     Render the home page with recent posts.
 
+    Posts are paginated by keyset on (created_at, id). Authors and categories
+    are joined into the page query and comment counts are read from the
+    denormalized Post.comment_count, so a page costs one query regardless of
+    board size.
+
+    Query Parameters:
+        cursor: Opaque token from the previous page's "older posts" link
+
     Returns:
         rendered_template: The home page with recent posts
     """
-    posts = Post.query.order_by(Post.created_at.desc()).all()
-    return render_template('main/index.html', posts=posts)
+    query = Post.query.options(joinedload(Post.author), joinedload(Post.category))
+    page = paginate_keyset(query, Post.created_at, Post.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=current_app.config['POSTS_PER_PAGE'])
+    return render_template('main/index.html', page=page, categories=category_nav())
+
+@bp.route('/category/<int:category_id>')
+@cache.cached(tags=lambda category_id: ['posts', 'categories', 'users'])
+def category(category_id):
+    """
+    List the posts of one category, newest first.
+
+    Posts are paginated by keyset on (created_at, id) within the category,
+    which ix_post_category_id_created_at_id serves without a sort.
+
+    Args:
+        category_id (int): The ID of the category
+
+    Query Parameters:
+        cursor: Opaque token from the previous page's "older posts" link
+
+    Returns:
+        rendered_template: A page of the category's posts
+    """
+    category = Category.query.get_or_404(category_id)
+    query = Post.query.options(joinedload(Post.author)).filter(Post.category_id == category_id)
+    page = paginate_keyset(query, Post.created_at, Post.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=current_app.config['POSTS_PER_PAGE'])
+    return render_template('main/index.html', page=page, category=category,
+                           categories=category_nav())
+
+def category_nav():
+    """
+    Categories for the navigation, with their denormalized post counts.
+
+    Returns:
+        list: (id, name, post_count) rows ordered by name
+    """
+    return db.session.query(Category.id, Category.name, Category.post_count) \
+        .order_by(Category.name) \
+        .all()
+
+def post_validators(post_id):
+    """
+    Validators for main.post, read without loading the post body.
+
+    The comment counter and newest comment ID together change on every
+    comment add or delete; author and category timestamps cover the names
+    shown alongside the post. Comments do not touch Post.updated_at, so no
+    Last-Modified is offered and clients revalidate by ETag.
+
+    Args:
+        post_id (int): The ID of the post
+
+    Returns:
+        tuple: (etag_parts, None)
+    """
+    newest_comment = db.session.query(func.max(Comment.id)) \
+        .filter(Comment.post_id == Post.id) \
+        .correlate(Post) \
+        .scalar_subquery()
+    row = db.session.query(Post.updated_at, Post.comment_count, newest_comment,
+                           User.updated_at, Category.updated_at) \
+        .join(User, User.id == Post.author_id) \
+        .outerjoin(Category, Category.id == Post.category_id) \
+        .filter(Post.id == post_id) \
+        .first()
+    if row is None:
+        abort(404)
+    return tuple(row), None
 
 @bp.route('/post/<int:post_id>')
+@conditional(post_validators)
+@cache.cached(tags=lambda post_id: [f'post:{post_id}', 'categories', 'users'])
 def post(post_id):
     """
     Display a specific post and its comments.
 
+    Only the first page of comments is rendered; further pages are fetched
+    from main.comments by the "load more" button.
+
     Args:
         post_id: The ID of the post to display
 
+    Query Parameters:
+        cursor: Start the comment list after this position (no-JS fallback)
+
     Returns:
         rendered_template: The post page with post content and comments
     """
     post = Post.query.get_or_404(post_id)
-    # Get comment count using a subquery
-    comment_count = Comment.query.filter_by(post_id=post_id).count()
+    comments = comment_page(post_id, request.args.get('cursor'))
     return render_template('main/post.html',
                          title=post.title,
                          post=post,
-                         comment_count=comment_count)
+                         comments=comments,
+                         comment_count=post.comment_count)
+
+@bp.route('/post/<int:post_id>/comments')
+@cache.cached(tags=lambda post_id: [f'post:{post_id}', 'users'])
+def comments(post_id):
+    """
+    Return one page of a post's comments for infinite scrolling.
+
+    Args:
+        post_id: The ID of the post whose comments to load
+
+    Query Parameters:
+        cursor: Token from the previous page's next_cursor
+
+    Returns:
+        JSON: {"html": rendered comment fragment, "next_cursor": token or null}
+    """
+    if not db.session.query(Post.id).filter_by(id=post_id).first():
+        abort(404)
+    page = comment_page(post_id, request.args.get('cursor'))
+    return jsonify(html=render_template('main/_comments.html', comments=page),
+                   next_cursor=page.next_cursor)
+
+def comment_page(post_id, cursor):
+    """
+    Fetch a page of comments newest first, with authors joined in.
+
+    Args:
+        post_id (int): The ID of the post
+        cursor (str): Keyset cursor, or None for the first page
+
+    Returns:
+        KeysetPage: Page of Comment objects
+    """
+    query = Comment.query.filter_by(post_id=post_id).options(joinedload(Comment.author))
+    return paginate_keyset(query, Comment.created_at, Comment.id,
+                           cursor=cursor,
+                           per_page=current_app.config['COMMENTS_PER_PAGE'])
 
 @bp.route('/post/create', methods=['GET', 'POST'])
 @login_required
@@ -73,7 +199,7 @@ def create_post():
     if request.method == 'POST':
         title = request.form.get('title')
         content = request.form.get('content')
-        category_id = request.form.get('category_id')
+        category_id = request.form.get('category_id', type=int)
         
         if not all([title, content, category_id]):
             flash('Please fill out all required fields.')
@@ -87,12 +213,16 @@ def create_post():
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
-                post.image_url = filename
+                post.image_url = images.store_upload(file)
         
         db.session.add(post)
+        db.session.flush()
+        search.index_document(post)
+        SiteStat.adjust('total_posts', 1)
+        UserStat.adjust(current_user.id, posts=1)
+        Category.adjust_post_count(category_id, 1)
         db.session.commit()
+        cache.invalidate('posts')
         flash('Your post has been created!')
         return redirect(url_for('main.post', post_id=post.id))
     
@@ -118,7 +248,11 @@ def add_comment(post_id):
     if content:
         comment = Comment(content=content, author=current_user, post=post)
         db.session.add(comment)
+        Post.adjust_comment_count(post.id, 1)
+        SiteStat.adjust('total_comments', 1)
+        UserStat.adjust(current_user.id, comments=1)
         db.session.commit()
+        cache.invalidate('posts', f'post:{post_id}')
         flash('Your comment has been added!', 'success')
     
     return redirect(url_for('main.post', post_id=post_id))
@@ -138,13 +272,17 @@ def delete_comment(id):
     comment = Comment.query.get_or_404(id)
     if not current_user.is_admin and current_user.id != comment.author.id:
         flash('You do not have permission to delete this comment.')
-        return redirect(url_for('main.post', id=comment.post_id))
+        return redirect(url_for('main.post', post_id=comment.post_id))
     
     post_id = comment.post_id
     db.session.delete(comment)
+    Post.adjust_comment_count(post_id, -1)
+    SiteStat.adjust('total_comments', -1)
+    UserStat.adjust(comment.author_id, comments=-1)
     db.session.commit()
+    cache.invalidate('posts', f'post:{post_id}')
     flash('Comment deleted.')
-    return redirect(url_for('main.post', id=post_id))
+    return redirect(url_for('main.post', post_id=post_id))
 
 @bp.route('/post/<int:id>/delete', methods=['POST'])
 @login_required
@@ -161,14 +299,26 @@ def delete_post(id):
     post = Post.query.get_or_404(id)
     if not current_user.is_admin and current_user.id != post.author.id:
         flash('You do not have permission to delete this post.')
-        return redirect(url_for('main.post', id=id))
+        return redirect(url_for('main.post', post_id=id))
     
-    # Delete associated comments first
-    Comment.query.filter_by(post_id=id).delete()
+    # Delete associated comments first, taking them off their authors' counts
+    commenters = db.session.query(Comment.author_id, db.func.count(Comment.id)) \
+        .filter(Comment.post_id == id) \
+        .group_by(Comment.author_id) \
+        .all()
+    for author_id, count in commenters:
+        UserStat.adjust(author_id, comments=-count)
+    deleted_comments = Comment.query.filter_by(post_id=id).delete()
     
     # Delete the post
+    search.remove_document(post)
     db.session.delete(post)
+    SiteStat.adjust('total_posts', -1)
+    SiteStat.adjust('total_comments', -deleted_comments)
+    UserStat.adjust(post.author_id, posts=-1)
+    Category.adjust_post_count(post.category_id, -1)
     db.session.commit()
+    cache.invalidate('posts', f'post:{id}')
     flash('Post deleted.')
     return redirect(url_for('main.index'))
 
@@ -189,17 +339,20 @@ def edit_post(id):
     # Check if user has permission to edit
     if not current_user.is_admin and current_user.id != post.author.id:
         flash('You do not have permission to edit this post.')
-        return redirect(url_for('main.post', id=id))
+        return redirect(url_for('main.post', post_id=id))
     
     if request.method == 'POST':
         title = request.form.get('title')
         content = request.form.get('content')
-        category_id = request.form.get('category_id')
+        category_id = request.form.get('category_id', type=int)
         
         if not all([title, content, category_id]):
             flash('Please fill out all required fields.')
             return redirect(url_for('main.edit_post', id=id))
         
+        if category_id != post.category_id:
+            Category.adjust_post_count(post.category_id, -1)
+            Category.adjust_post_count(category_id, 1)
         post.title = title
         post.content = content
         post.category_id = category_id
@@ -209,25 +362,20 @@ def edit_post(id):
             file = request.files['image']
             if file and file.filename:
                 if allowed_file(file.filename):
-                    # Delete old image if it exists
-                    if post.image_url:
-                        try:
-                            old_image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], post.image_url)
-                            if os.path.exists(old_image_path):
-                                os.remove(old_image_path)
-                        except Exception as e:
-                            current_app.logger.error(f"Error deleting old image: {e}")
-                    
-                    filename = secure_filename(file.filename)
-                    file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
-                    post.image_url = filename
+                    # The old image is kept: stored files are shared by
+                    # every post or avatar with the same content
+                    post.image_url = images.store_upload(file)
                 else:
                     flash('Invalid file type.')
                     return redirect(url_for('main.edit_post', id=id))
         
+        search.index_document(post)
+        # The post is listed on its author's profile
+        UserStat.adjust(post.author_id)
         db.session.commit()
+        cache.invalidate('posts', f'post:{id}')
         flash('Your post has been updated!')
-        return redirect(url_for('main.post', id=id))
+        return redirect(url_for('main.post', post_id=id))
     
     categories = Category.query.all()
     return render_template('main/edit_post.html', post=post, categories=categories)
@@ -244,7 +392,7 @@ def set_language(lang_code):
         redirect: Redirect to the previous page or home page
     """
     # Validate language code
-    if lang_code in ['en', 'ua', 'ru']:
+    if lang_code in i18n.LANGUAGES:
         session['language'] = lang_code
     return redirect(request.referrer or url_for('main.index'))
 
@@ -5,21 +5,62 @@ This module handles all news-related routes including creating,
 viewing, editing, and deleting news articles.
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
-from app.models import News
+from sqlalchemy.orm import defer, joinedload
+from app.models import News, NewsSubjectCount, User, UserStat
 from app.forms import NewsForm
-from app import db
+from app import db, search, cache
+from app.conditional import conditional
+from app.pagination import paginate_keyset
 
 bp = Blueprint('news', __name__, url_prefix='/news')
 
 @bp.route('/')
+@cache.cached(tags=lambda: ['news', 'users'])
 def index():
-    """Display all news articles."""
-    news_list = News.query.order_by(News.created_at.desc()).all()
-    return render_template('news/index.html', news_list=news_list)
+    """
+    Display news articles, newest first, with a subject facet sidebar.
+
+    Articles are paginated by keyset on (created_at, id) and only an excerpt
+    of each body is read. Facet counts come from NewsSubjectCount, which
+    the write routes keep current.
+
+    Query Parameters:
+        subject: Only show articles with this subject
+        cursor: Opaque token from the previous page's "older news" link
+
+    Returns:
+        rendered_template: A page of news articles
+    """
+    subject = request.args.get('subject', '').strip()
+    excerpt = db.func.substr(News.content, 1, 200).label('excerpt')
+    query = db.session.query(News, excerpt) \
+        .options(defer(News.content), joinedload(News.author))
+    if subject:
+        query = query.filter(News.subject == subject)
+    page = paginate_keyset(query, News.created_at, News.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=current_app.config['NEWS_PER_PAGE'])
+    subjects = NewsSubjectCount.query \
+        .filter(NewsSubjectCount.count > 0) \
+        .order_by(NewsSubjectCount.subject) \
+        .all()
+    return render_template('news/index.html', page=page, subjects=subjects, subject=subject)
+
+def news_validators(news_id):
+    """Validators for news.view: the article's and its author's timestamps."""
+    row = db.session.query(News.updated_at, User.updated_at) \
+        .join(User, User.id == News.author_id) \
+        .filter(News.id == news_id) \
+        .first()
+    if row is None:
+        abort(404)
+    return tuple(row), max(value for value in row if value is not None)
 
 @bp.route('/<int:news_id>')
+@conditional(news_validators)
+@cache.cached(tags=lambda news_id: [f'news:{news_id}', 'users'])
 def view(news_id):
     """Display a specific news article."""
     news = News.query.get_or_404(news_id)
@@ -38,7 +79,12 @@ def create():
             author=current_user
         )
         db.session.add(news)
+        db.session.flush()
+        search.index_document(news)
+        NewsSubjectCount.adjust(news.subject, 1)
+        UserStat.adjust(current_user.id, news=1)
         db.session.commit()
+        cache.invalidate('news')
         flash('News article has been created!', 'success')
         return redirect(url_for('news.view', news_id=news.id))
     return render_template('news/create.html', form=form)
@@ -54,10 +100,15 @@ def edit(news_id):
     
     form = NewsForm()
     if form.validate_on_submit():
+        if form.subject.data != news.subject:
+            NewsSubjectCount.adjust(news.subject, -1)
+            NewsSubjectCount.adjust(form.subject.data, 1)
         news.title = form.title.data
         news.content = form.content.data
         news.subject = form.subject.data
+        search.index_document(news)
         db.session.commit()
+        cache.invalidate('news', f'news:{news_id}')
         flash('News article has been updated!', 'success')
         return redirect(url_for('news.view', news_id=news.id))
     elif request.method == 'GET':
@@ -75,7 +126,11 @@ def delete(news_id):
         flash('You can only delete your own news articles.', 'danger')
         return redirect(url_for('news.view', news_id=news.id))
     
+    search.remove_document(news)
+    NewsSubjectCount.adjust(news.subject, -1)
+    UserStat.adjust(news.author_id, news=-1)
     db.session.delete(news)
     db.session.commit()
+    cache.invalidate('news', f'news:{news_id}')
     flash('News article has been deleted!', 'success')
     return redirect(url_for('news.index')) 
\ No newline at end of file
@@ -11,13 +11,14 @@ Routes:
     - /profile/<username>: View other user's profile
     - /profile/settings: Account settings
 """
-import os
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from app.models import db, User
-from app import create_app
+from sqlalchemy.orm import load_only
+from app.models import db, User, Post, SiteStat, UserStat
+from app import cache, images, stats
+from app.conditional import conditional
 from app.forms import EditProfileForm
+from app.pagination import paginate_keyset
 
 bp = Blueprint('profile', __name__, url_prefix='/profile')
 
@@ -26,17 +27,44 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _render_profile(user):
+    """
+    Render a profile with one page of the user's posts.
+
+    Posts are paginated by keyset on (created_at, id) and only the columns
+    the list shows, plus an excerpt of the body, are read. The post, comment
+    and news counts come from the user's UserStat row.
+
+    Args:
+        user (User): The profile's owner
+
+    Returns:
+        rendered_template: The profile page
+    """
+    excerpt = db.func.substr(Post.content, 1, 200).label('excerpt')
+    query = db.session.query(Post, excerpt) \
+        .options(load_only(Post.id, Post.title, Post.created_at)) \
+        .filter(Post.author_id == user.id)
+    page = paginate_keyset(query, Post.created_at, Post.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=current_app.config['POSTS_PER_PAGE'])
+    return render_template('profile/view.html', user=user, page=page,
+                           stats=stats.get_user_stats(user.id))
+
 @bp.route('/')
 @login_required
 def view_profile():
     """
     Display user's own profile.
 
+    Query Parameters:
+        cursor: Opaque token from the previous page's "older posts" link
+
     Returns:
         rendered_template: User's profile page with their information
     """
     user = User.query.filter_by(username=current_user.username).first_or_404()
-    return render_template('profile/view.html', user=user)
+    return _render_profile(user)
 
 @bp.route('/edit', methods=['GET', 'POST'])
 @login_required
@@ -45,8 +73,7 @@ def edit_profile():
     if form.validate_on_submit():
         if form.avatar.data:
             # Handle avatar upload
-            picture_file = save_picture(form.avatar.data)
-            current_user.avatar = picture_file
+            current_user.avatar = images.store_upload(form.avatar.data)
             
         current_user.username = form.username.data
         current_user.email = form.email.data
@@ -56,6 +83,8 @@ def edit_profile():
         current_user.newsletter_subscription = form.newsletter_subscription.data
         
         db.session.commit()
+        # Cached pages show usernames and avatars next to posts, comments and news
+        cache.invalidate('users')
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('profile.view_profile'))
     
@@ -69,10 +98,30 @@ def edit_profile():
     
     return render_template('profile/edit_profile.html', form=form)
 
+def profile_validators(username):
+    """
+    Validators for profile.view_profile_other.
+
+    The profile lists the user's posts and counters. Every write that
+    changes them bumps UserStat.updated_at, so the user's and the stats
+    row's timestamps are enough and no posts are read.
+    """
+    user = db.session.query(User.id, User.updated_at) \
+        .filter(User.username == username) \
+        .first()
+    if user is None:
+        abort(404)
+    user_stats = stats.get_user_stats(user.id)
+    validators = (user.updated_at, user_stats.post_count, user_stats.comment_count,
+                  user_stats.news_count, user_stats.updated_at)
+    return validators, max(value for value in (user.updated_at, user_stats.updated_at)
+                           if value is not None)
+
 @bp.route('/<username>')
+@conditional(profile_validators)
 def view_profile_other(username):
     user = User.query.filter_by(username=username).first_or_404()
-    return render_template('profile/view.html', user=user)
+    return _render_profile(user)
 
 @bp.route('/settings')
 @login_required
@@ -84,13 +133,11 @@ def account_settings():
 @bp.route('/profile/delete', methods=['POST'])
 @login_required
 def delete_account():
-    # Delete user's avatar file if it exists
-    if current_user.avatar:
-        avatar_path = os.path.join(current_app.root_path, 'static/avatars', current_user.avatar)
-        if os.path.exists(avatar_path):
-            os.remove(avatar_path)
-    
+    # The avatar file is left in place: uploads are stored by content hash
+    # and may be shared with other users or posts
+    UserStat.query.filter_by(user_id=current_user.id).delete()
     db.session.delete(current_user)
+    SiteStat.adjust('total_users', -1)
     db.session.commit()
     flash('Your account has been deleted.', 'info')
     return redirect(url_for('main.index'))
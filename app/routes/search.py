@@ -0,0 +1,34 @@
+"""
+Search routes module.
+
+This module exposes full-text search over posts and news articles. Ranking,
+highlighting and the index itself are handled by app.search.
+
+Routes:
+    - /search: Ranked, paginated search results
+"""
+
+from flask import Blueprint, render_template, request, current_app
+from app import search as search_index
+
+bp = Blueprint('search', __name__, url_prefix='/search')
+
+@bp.route('/')
+def index():
+    """
+    Display search results for a query.
+
+    Query Parameters:
+        q: Free-text query
+        page: 1-based results page
+
+    Returns:
+        rendered_template: Search form with ranked results
+    """
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    results = None
+    if query:
+        results = search_index.search(query, page,
+                                      per_page=current_app.config['SEARCH_RESULTS_PER_PAGE'])
+    return render_template('search/index.html', query=query, results=results)
@@ -0,0 +1,406 @@
+"""
+Full-text search module.
+
+This module maintains a full-text index over posts and news articles and
+answers ranked, paginated queries against it. The index lives in the main
+database and is implemented natively for each supported backend:
+
+    - SQLite: FTS5 virtual table ``search_index`` ranked with bm25
+    - PostgreSQL: ``search_document`` table with a GIN-indexed tsvector
+    - MySQL: ``search_document`` table with a FULLTEXT index
+
+Routes keep the index current by calling index_document and remove_document
+inside the same transaction as the content change. ``flask search rebuild``
+recreates the index from scratch.
+
+Exports:
+    index_document: Add or refresh a Post or News entry in the index
+    remove_document: Drop a Post or News entry from the index
+    search: Run a ranked, paginated query
+    indexed_text: The text of a post or news body that is indexed
+    rebuild_index: Recreate the index from the content tables
+"""
+
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+from app import db
+from app.models import Post, News
+
+KIND_POST = 'post'
+KIND_NEWS = 'news'
+KIND_BY_MODEL = {Post: KIND_POST, News: KIND_NEWS}
+
+# Highlight markers returned by the database; they cannot occur in escaped
+# text, so they are swapped for <mark> tags only after escaping.
+MARK_START = '\x02'
+MARK_STOP = '\x03'
+
+SNIPPET_WORDS = 30
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchResult:
+    """
+    A single ranked search hit.
+
+    Attributes:
+        kind (str): KIND_POST or KIND_NEWS
+        doc_id (int): ID of the matching Post or News row
+        title (Markup): Title with matched terms wrapped in <mark>
+        snippet (Markup): Excerpt of the content around the match
+    """
+
+    def __init__(self, kind, doc_id, title, snippet):
+        self.kind = kind
+        self.doc_id = doc_id
+        self.title = _render_marks(title)
+        self.snippet = _render_marks(snippet)
+
+
+class SearchPage:
+    """
+    One page of search results.
+
+    Attributes:
+        results (list): SearchResult objects in rank order
+        page (int): 1-based page number
+        has_next (bool): Whether another page of results exists
+    """
+
+    def __init__(self, results, page, has_next):
+        self.results = results
+        self.page = page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+
+def _render_marks(value):
+    return Markup(str(escape(value or ''))
+                  .replace(MARK_START, '<mark>')
+                  .replace(MARK_STOP, '</mark>'))
+
+
+def _terms(query):
+    return _TERM_RE.findall(query)
+
+
+def indexed_text(kind, content):
+    """
+    Return the text of a document body that goes into the index.
+
+    Post bodies are rendered as HTML, so their tags are stripped; news bodies
+    are plain text and are indexed as written, so ``a < b`` stays searchable.
+
+    Args:
+        kind (str): KIND_POST or KIND_NEWS
+        content (str): Body as stored
+
+    Returns:
+        str: Plain text to index
+    """
+    if kind == KIND_POST:
+        return Markup(content).striptags()
+    return content
+
+
+def _document(obj):
+    """Return (kind, id, title, plain-text content) for a Post or News row."""
+    kind = KIND_BY_MODEL[type(obj)]
+    return kind, obj.id, obj.title, indexed_text(kind, obj.content)
+
+
+class SQLiteBackend:
+    """FTS5 index. The rowid packs the document kind and id together."""
+
+    KIND_CODES = {KIND_POST: 0, KIND_NEWS: 1}
+    KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+    def _rowid(self, kind, doc_id):
+        return doc_id * len(self.KIND_CODES) + self.KIND_CODES[kind]
+
+    def create_schema(self, connection):
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+            "USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    def drop_schema(self):
+        db.session.execute(text('DROP TABLE IF EXISTS search_index'))
+
+    def upsert(self, documents):
+        rows = [
+            {'rowid': self._rowid(kind, doc_id), 'title': title, 'content': content}
+            for kind, doc_id, title, content in documents
+        ]
+        db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'), rows)
+        db.session.execute(text(
+            'INSERT INTO search_index (rowid, title, content) VALUES (:rowid, :title, :content)'
+        ), rows)
+
+    def remove(self, kind, doc_id):
+        db.session.execute(text('DELETE FROM search_index WHERE rowid = :rowid'),
+                           {'rowid': self._rowid(kind, doc_id)})
+
+    def query(self, terms, limit, offset):
+        match = ' '.join(f'"{term}"' for term in terms)
+        rows = db.session.execute(text(
+            'SELECT rowid, '
+            '       highlight(search_index, 0, :start, :stop), '
+            "       snippet(search_index, 1, :start, :stop, '…', :words) "
+            'FROM search_index '
+            'WHERE search_index MATCH :match '
+            'ORDER BY bm25(search_index, 10.0, 1.0) '
+            'LIMIT :limit OFFSET :offset'
+        ), {'match': match, 'start': MARK_START, 'stop': MARK_STOP,
+            'words': SNIPPET_WORDS, 'limit': limit, 'offset': offset})
+        size = len(self.KIND_CODES)
+        return [
+            SearchResult(self.KINDS[rowid % size], rowid // size, title, snippet)
+            for rowid, title, snippet in rows
+        ]
+
+
+class PostgresBackend:
+    """tsvector index with title terms weighted above content terms."""
+
+    TS_CONFIG = 'simple'
+
+    def create_schema(self, connection):
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS search_document ('
+            '    kind VARCHAR(16) NOT NULL,'
+            '    doc_id INTEGER NOT NULL,'
+            '    title TEXT NOT NULL,'
+            '    content TEXT NOT NULL,'
+            '    tsv TSVECTOR NOT NULL,'
+            '    PRIMARY KEY (kind, doc_id))'
+        ))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_search_document_tsv '
+            'ON search_document USING GIN (tsv)'
+        ))
+
+    def drop_schema(self):
+        db.session.execute(text('DROP TABLE IF EXISTS search_document'))
+
+    def upsert(self, documents):
+        rows = [
+            {'kind': kind, 'doc_id': doc_id, 'title': title, 'content': content}
+            for kind, doc_id, title, content in documents
+        ]
+        db.session.execute(text(
+            'INSERT INTO search_document (kind, doc_id, title, content, tsv) '
+            'VALUES (:kind, :doc_id, :title, :content, '
+            f"        setweight(to_tsvector('{self.TS_CONFIG}', :title), 'A') || "
+            f"        setweight(to_tsvector('{self.TS_CONFIG}', :content), 'B')) "
+            'ON CONFLICT (kind, doc_id) DO UPDATE '
+            'SET title = EXCLUDED.title, content = EXCLUDED.content, tsv = EXCLUDED.tsv'
+        ), rows)
+
+    def remove(self, kind, doc_id):
+        db.session.execute(text(
+            'DELETE FROM search_document WHERE kind = :kind AND doc_id = :doc_id'
+        ), {'kind': kind, 'doc_id': doc_id})
+
+    def query(self, terms, limit, offset):
+        # Rank and limit first so ts_headline only runs for the rows on the page
+        rows = db.session.execute(text(
+            'SELECT d.kind, d.doc_id, '
+            f"       ts_headline('{self.TS_CONFIG}', d.title, hit.q, :title_opts), "
+            f"       ts_headline('{self.TS_CONFIG}', d.content, hit.q, :snippet_opts) "
+            'FROM ('
+            "    SELECT kind, doc_id, q, ts_rank(tsv, q) AS rank "
+            f"    FROM search_document, plainto_tsquery('{self.TS_CONFIG}', :query) AS q "
+            '    WHERE tsv @@ q '
+            '    ORDER BY rank DESC '
+            '    LIMIT :limit OFFSET :offset'
+            ') AS hit '
+            'JOIN search_document AS d ON d.kind = hit.kind AND d.doc_id = hit.doc_id '
+            'ORDER BY hit.rank DESC'
+        ), {
+            'query': ' '.join(terms),
+            'title_opts': f'StartSel={MARK_START}, StopSel={MARK_STOP}, HighlightAll=true',
+            'snippet_opts': (f'StartSel={MARK_START}, StopSel={MARK_STOP}, '
+                             f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'),
+            'limit': limit,
+            'offset': offset,
+        })
+        return [SearchResult(*row) for row in rows]
+
+
+class MySQLBackend:
+    """InnoDB FULLTEXT index. MySQL has no headline function, so snippets are cut in Python."""
+
+    def create_schema(self, connection):
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS search_document ('
+            '    kind VARCHAR(16) NOT NULL,'
+            '    doc_id INTEGER NOT NULL,'
+            '    title TEXT NOT NULL,'
+            '    content MEDIUMTEXT NOT NULL,'
+            '    PRIMARY KEY (kind, doc_id),'
+            '    FULLTEXT KEY ix_search_document_fulltext (title, content)'
+            ') ENGINE=InnoDB DEFAULT CHARSET=utf8mb4'
+        ))
+
+    def drop_schema(self):
+        db.session.execute(text('DROP TABLE IF EXISTS search_document'))
+
+    def upsert(self, documents):
+        rows = [
+            {'kind': kind, 'doc_id': doc_id, 'title': title, 'content': content}
+            for kind, doc_id, title, content in documents
+        ]
+        db.session.execute(text(
+            'INSERT INTO search_document (kind, doc_id, title, content) '
+            'VALUES (:kind, :doc_id, :title, :content) '
+            'ON DUPLICATE KEY UPDATE title = VALUES(title), content = VALUES(content)'
+        ), rows)
+
+    def remove(self, kind, doc_id):
+        db.session.execute(text(
+            'DELETE FROM search_document WHERE kind = :kind AND doc_id = :doc_id'
+        ), {'kind': kind, 'doc_id': doc_id})
+
+    def query(self, terms, limit, offset):
+        rows = db.session.execute(text(
+            'SELECT kind, doc_id, title, content '
+            'FROM search_document '
+            'WHERE MATCH (title, content) AGAINST (:query IN NATURAL LANGUAGE MODE) '
+            'ORDER BY MATCH (title, content) AGAINST (:query IN NATURAL LANGUAGE MODE) DESC '
+            'LIMIT :limit OFFSET :offset'
+        ), {'query': ' '.join(terms), 'limit': limit, 'offset': offset})
+        pattern = re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+        return [
+            SearchResult(kind, doc_id, _mark(pattern, title), _mark(pattern, _excerpt(pattern, content)))
+            for kind, doc_id, title, content in rows
+        ]
+
+
+def _mark(pattern, value):
+    return pattern.sub(lambda m: MARK_START + m.group(0) + MARK_STOP, value)
+
+
+def _excerpt(pattern, content):
+    """Cut SNIPPET_WORDS words of content centred on the first match."""
+    words = content.split()
+    first = next((i for i, word in enumerate(words) if pattern.search(word)), 0)
+    start = max(first - SNIPPET_WORDS // 2, 0)
+    excerpt = ' '.join(words[start:start + SNIPPET_WORDS])
+    if start > 0:
+        excerpt = '…' + excerpt
+    if start + SNIPPET_WORDS < len(words):
+        excerpt += '…'
+    return excerpt
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+    'mysql': MySQLBackend,
+}
+
+_backends = {}
+
+
+def get_backend():
+    """
+    Return the search backend matching the database in use.
+
+    Returns:
+        object: Backend instance for the current engine's dialect
+    """
+    dialect = db.engine.dialect.name
+    if dialect not in _backends:
+        _backends[dialect] = BACKENDS[dialect]()
+    return _backends[dialect]
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_search_schema(target, connection, **kw):
+    """Create the index structures whenever db.create_all() builds the tables."""
+    BACKENDS[connection.dialect.name]().create_schema(connection)
+
+
+def index_document(obj):
+    """
+    Add or refresh a post or news article in the search index.
+
+    Must be called after the row has an ID (i.e. after flush); the index
+    write joins the caller's transaction.
+
+    Args:
+        obj (Post|News): The content row to index
+    """
+    get_backend().upsert([_document(obj)])
+
+
+def remove_document(obj):
+    """
+    Remove a post or news article from the search index.
+
+    Args:
+        obj (Post|News): The content row being deleted
+    """
+    get_backend().remove(KIND_BY_MODEL[type(obj)], obj.id)
+
+
+def search(query, page=1, per_page=20):
+    """
+    Run a ranked full-text query.
+
+    Args:
+        query (str): Free-text query as typed by the user
+        page (int): 1-based page number
+        per_page (int): Results per page
+
+    Returns:
+        SearchPage: Ranked results with highlighted titles and snippets
+    """
+    terms = _terms(query)
+    page = max(page, 1)
+    if not terms:
+        return SearchPage([], page, False)
+    results = get_backend().query(terms, per_page + 1, (page - 1) * per_page)
+    return SearchPage(results[:per_page], page, len(results) > per_page)
+
+
+def rebuild_index(batch_size=500):
+    """
+    Drop and recreate the search index from the posts and news tables.
+
+    Args:
+        batch_size (int): Rows indexed per transaction
+
+    Yields:
+        tuple: (model name, rows indexed so far) after each committed batch
+    """
+    backend = get_backend()
+    backend.drop_schema()
+    backend.create_schema(db.session.connection())
+    db.session.commit()
+
+    for model, kind in KIND_BY_MODEL.items():
+        last_id = 0
+        indexed = 0
+        while True:
+            rows = db.session.query(model.id, model.title, model.content) \
+                .filter(model.id > last_id) \
+                .order_by(model.id) \
+                .limit(batch_size) \
+                .all()
+            if not rows:
+                break
+            backend.upsert([
+                (kind, row.id, row.title, indexed_text(kind, row.content))
+                for row in rows
+            ])
+            db.session.commit()
+            indexed += len(rows)
+            last_id = rows[-1].id
+            yield model.__name__, indexed
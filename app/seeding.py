@@ -0,0 +1,274 @@
+"""
+Synthetic data module.
+
+Fills a database with generated users, roles, categories, posts, comments,
+news and activity rows for load testing. Rows are written with bulk
+INSERTs of ``batch_size`` rows per transaction and explicit primary keys,
+so foreign keys can be chosen without reading the rows back and millions
+of rows seed in minutes.
+
+Content is shaped like the real site: titles of a few words, posts of one
+to several paragraphs, comments of a sentence or two, timestamps spread
+over the last ``days`` days with comments following their post. Every
+generated user shares the password SEED_PASSWORD and the first generated
+user is an administrator, so the load benchmark can log in.
+
+Exports:
+    SEED_PASSWORD: Password of every generated user
+    seed_database: Insert generated rows and yield progress
+"""
+
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from app import db, database, passwords, stats
+from app.models import Role, User, Category, Post, Comment, News, Activity, init_roles
+
+SEED_PASSWORD = 'password'
+
+WORDS = (
+    'board community update question answer thread topic release feature issue '
+    'project meeting schedule report design review change support idea event '
+    'guide help team member forum system server database page search account '
+    'profile setting news story weekend travel music game photo library code '
+    'test build deploy fix error problem solution performance speed cache query '
+    'the a an and or but with for from about into over after before during of '
+    'to in on at by is are was were be been has have had will would can could '
+    'should new old good great small large first last next other same different '
+    'local public open simple quick easy hard important useful interesting'
+).split()
+SUBJECTS = ['Announcements', 'Community', 'Development', 'Events', 'Maintenance',
+            'Releases', 'Security', 'Tech']
+ACTIONS = ['Create post', 'Add comment', 'Edit post', 'Edit profile', 'Create news',
+           'Delete comment', 'Toggle user status', 'Edit role']
+
+
+class _Text:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def sentence(self, low=6, high=18):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def title(self):
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(3, 10))).capitalize()
+
+    def paragraph(self):
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(3, 8)))
+
+    def paragraphs(self, low, high):
+        return '\n\n'.join(self.paragraph() for _ in range(self.rng.randint(low, high)))
+
+
+def _next_id(connection, model):
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _insert(model, count, batch_size, make_row):
+    # Generated rows get ids start, start + 1, ...; yields rows inserted so far
+    with db.engine.begin() as connection:
+        start = _next_id(connection, model)
+    inserted = 0
+    while inserted < count:
+        size = min(batch_size, count - inserted)
+        rows = [make_row(start + inserted + offset) for offset in range(size)]
+        with db.engine.begin() as connection:
+            connection.execute(model.__table__.insert(), rows)
+        inserted += size
+        yield inserted
+    with db.engine.begin() as connection:
+        database.sync_id_sequence(connection, model.__table__)
+
+
+def _recount_comments(first_post_id):
+    # Comments are inserted after their posts, so the new posts are counted
+    # in one statement instead of per comment; None means no new posts
+    if first_post_id is None:
+        return
+    posts = Post.__table__
+    with db.engine.begin() as connection:
+        connection.execute(
+            posts.update()
+            .where(posts.c.id >= first_post_id)
+            .values(comment_count=select(func.count(Comment.id))
+                    .where(Comment.post_id == posts.c.id)
+                    .scalar_subquery()))
+
+
+def _reconcile_counters(batch_size):
+    stats.reconcile_site_stats()
+    stats.reconcile_news_subjects()
+    stats.reconcile_category_counts()
+    for _ in stats.reconcile_user_stats(batch_size):
+        pass
+
+
+def seed_database(users=1000, roles=0, categories=10, posts=10000, comments=50000,
+                  news=500, activities=20000, days=365, batch_size=5000, seed=0):
+    """
+    Insert generated rows next to the existing data.
+
+    Counters (Post.comment_count, Category.post_count, the dashboard
+    statistics, the news subject counts and the per-user counts) are brought
+    up to date afterwards; the search index is left to the caller.
+
+    Args:
+        users (int): Users to create; the first one is an administrator
+        roles (int): Roles to create besides the default ones
+        categories (int): Categories to create
+        posts (int): Posts to create
+        comments (int): Comments to create, spread unevenly over the new posts
+        news (int): News articles to create
+        activities (int): Activity log entries to create
+        days (int): Length of the period timestamps are spread over
+        batch_size (int): Rows per INSERT transaction
+        seed (int): Random seed, so runs are reproducible
+
+    Yields:
+        tuple: (model name, rows inserted so far) after each batch
+
+    Raises:
+        ValueError: If posts, comments, news or activities have no user or
+            category to refer to
+    """
+    rng = random.Random(seed)
+    words = _Text(rng)
+    now = datetime.utcnow()
+    period = timedelta(days=days)
+    begin = now - period
+
+    init_roles()
+    role_ids = [role_id for role_id, in db.session.query(Role.id).order_by(Role.id)]
+    default_role = Role.query.filter_by(name='User').one().id
+
+    def role_row(row_id):
+        return {'id': row_id, 'name': f'Seed role {row_id}', 'permissions': rng.randrange(1, 32)}
+
+    for inserted in _insert(Role, roles, batch_size, role_row):
+        yield 'Role', inserted
+    if roles:
+        role_ids = [role_id for role_id, in db.session.query(Role.id).order_by(Role.id)]
+
+    pwhash = passwords.hash_password(SEED_PASSWORD)
+    first_user = None
+
+    def user_row(row_id):
+        nonlocal first_user
+        if first_user is None:
+            first_user = row_id
+        created = begin + period * rng.random()
+        return {
+            'id': row_id,
+            'username': f'seed_user_{row_id}',
+            'email': f'seed_user_{row_id}@example.com',
+            'password_hash': pwhash,
+            'bio': words.sentence(8, 40) if rng.random() < 0.4 else None,
+            'location': None,
+            'website': None,
+            'avatar': None,
+            'newsletter_subscription': rng.random() < 0.2,
+            'created_at': created,
+            'updated_at': created,
+            'is_admin': row_id == first_user,
+            'active': rng.random() < 0.97,
+            # Most people keep the default role
+            'role_id': default_role if rng.random() < 0.9 else rng.choice(role_ids),
+        }
+
+    for inserted in _insert(User, users, batch_size, user_row):
+        yield 'User', inserted
+
+    def category_row(row_id):
+        created = begin + period * rng.random()
+        return {'id': row_id, 'name': f'Category {row_id}', 'description': words.sentence(4, 12),
+                'created_at': created, 'updated_at': created}
+
+    for inserted in _insert(Category, categories, batch_size, category_row):
+        yield 'Category', inserted
+
+    with db.engine.begin() as connection:
+        user_ids = [row_id for row_id, in connection.execute(select(User.id))]
+        category_ids = [row_id for row_id, in connection.execute(select(Category.id))]
+    if not user_ids and (posts or comments or news or activities):
+        raise ValueError('Cannot create content without any users')
+    if not category_ids and posts:
+        raise ValueError('Cannot create posts without any categories')
+
+    # Posts are spaced evenly so a comment can find its post's date from its id
+    post_start = None
+    post_step = period / max(posts, 1)
+
+    def post_time(row_id):
+        return begin + post_step * (row_id - post_start)
+
+    def post_row(row_id):
+        nonlocal post_start
+        if post_start is None:
+            post_start = row_id
+        created = post_time(row_id)
+        return {
+            'id': row_id,
+            'title': words.title(),
+            'content': words.paragraphs(1, 6),
+            'created_at': created,
+            'updated_at': created,
+            'author_id': rng.choice(user_ids),
+            'category_id': rng.choice(category_ids),
+            'comment_count': 0,
+            'image_url': None,
+        }
+
+    for inserted in _insert(Post, posts, batch_size, post_row):
+        yield 'Post', inserted
+
+    if comments and not posts:
+        raise ValueError('Comments are only generated for new posts')
+
+    def comment_row(row_id):
+        # Squaring skews comments towards the newest posts
+        post_id = post_start + int((1 - rng.random() ** 2) * posts)
+        post_id = min(post_id, post_start + posts - 1)
+        created = min(post_time(post_id) + timedelta(minutes=rng.expovariate(1 / 600)), now)
+        return {
+            'id': row_id,
+            'content': words.sentence(5, 25) if rng.random() < 0.7 else words.paragraph(),
+            'created_at': created,
+            'updated_at': created,
+            'author_id': rng.choice(user_ids),
+            'post_id': post_id,
+        }
+
+    for inserted in _insert(Comment, comments, batch_size, comment_row):
+        yield 'Comment', inserted
+
+    _recount_comments(post_start)
+
+    def news_row(row_id):
+        created = begin + period * rng.random()
+        return {
+            'id': row_id,
+            'title': words.title(),
+            'content': words.paragraphs(2, 8),
+            'subject': rng.choice(SUBJECTS),
+            'author_id': rng.choice(user_ids),
+            'created_at': created,
+            'updated_at': created,
+        }
+
+    for inserted in _insert(News, news, batch_size, news_row):
+        yield 'News', inserted
+
+    def activity_row(row_id):
+        return {
+            'id': row_id,
+            'user_id': rng.choice(user_ids),
+            'action': rng.choice(ACTIONS),
+            'details': words.sentence(3, 12) if rng.random() < 0.5 else None,
+            'timestamp': begin + period * rng.random(),
+        }
+
+    for inserted in _insert(Activity, activities, batch_size, activity_row):
+        yield 'Activity', inserted
+
+    _reconcile_counters(batch_size)
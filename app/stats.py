@@ -0,0 +1,161 @@
+"""
+Site statistics module.
+
+This module serves the admin dashboard counters from the SiteStat table
+instead of running COUNT(*) over every content table on each page load.
+Write paths keep the counters current with SiteStat.adjust; whenever the
+stored values are older than STATS_RECONCILE_INTERVAL they are recounted
+from the source tables, which also repairs any drift.
+
+Exports:
+    get_site_stats: Current counters, reconciling them first if stale
+    reconcile_site_stats: Recount every counter from the source tables
+    reconcile_news_subjects: Recount the per-subject news counts
+    reconcile_category_counts: Recount Category.post_count
+    get_user_stats: A user's profile counters, recounting them if missing
+    reconcile_user_stats: Recount the profile counters of every user
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from app import db
+from app.models import SiteStat, User, Post, Category, Comment, News, NewsSubjectCount, UserStat
+
+STAT_MODELS = {
+    'total_users': User,
+    'total_posts': Post,
+    'total_categories': Category,
+    'total_comments': Comment,
+}
+
+USER_STAT_MODELS = {
+    'post_count': Post,
+    'comment_count': Comment,
+    'news_count': News,
+}
+
+
+def reconcile_site_stats():
+    """
+    Recount every dashboard counter and store the results.
+
+    Returns:
+        dict: Counter name to recounted value
+    """
+    now = datetime.utcnow()
+    values = {}
+    for name, model in STAT_MODELS.items():
+        values[name] = db.session.query(db.func.count(model.id)).scalar()
+        db.session.merge(SiteStat(name=name, value=values[name], reconciled_at=now))
+    db.session.commit()
+    return values
+
+
+def get_site_stats():
+    """
+    Return the dashboard counters.
+
+    Returns:
+        dict: Counter name to value
+    """
+    rows = SiteStat.query.filter(SiteStat.name.in_(STAT_MODELS)).all()
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['STATS_RECONCILE_INTERVAL'])
+    if len(rows) < len(STAT_MODELS) or any(row.reconciled_at < cutoff for row in rows):
+        return reconcile_site_stats()
+    return {row.name: row.value for row in rows}
+
+
+def reconcile_news_subjects():
+    """
+    Recount the news articles per subject and store the results.
+
+    Returns:
+        dict: Subject to recounted number of articles
+    """
+    counts = dict(db.session.query(News.subject, db.func.count(News.id))
+                  .group_by(News.subject).all())
+    NewsSubjectCount.query.filter(NewsSubjectCount.subject.notin_(counts)) \
+        .delete(synchronize_session=False)
+    for subject, count in counts.items():
+        db.session.merge(NewsSubjectCount(subject=subject, count=count))
+    db.session.commit()
+    return counts
+
+
+def reconcile_category_counts():
+    """
+    Recount the posts of every category and store the results.
+
+    Category.updated_at is kept as is, since the categories were not edited.
+
+    Returns:
+        dict: Category name to recounted number of posts
+    """
+    table = Category.__table__
+    db.session.execute(
+        table.update().values(
+            post_count=db.select(db.func.count(Post.id))
+            .where(Post.category_id == table.c.id)
+            .scalar_subquery(),
+            updated_at=table.c.updated_at))
+    db.session.commit()
+    return dict(db.session.query(Category.name, Category.post_count).all())
+
+
+def _recount_users(user_ids):
+    counts = {user_id: dict.fromkeys(USER_STAT_MODELS, 0) for user_id in user_ids}
+    for field, model in USER_STAT_MODELS.items():
+        rows = db.session.query(model.author_id, db.func.count(model.id)) \
+            .filter(model.author_id.in_(user_ids)) \
+            .group_by(model.author_id)
+        for author_id, count in rows:
+            counts[author_id][field] = count
+    now = datetime.utcnow()
+    for user_id, values in counts.items():
+        db.session.merge(UserStat(user_id=user_id, updated_at=now, **values))
+    db.session.commit()
+
+
+def get_user_stats(user_id):
+    """
+    Return a user's profile counters, counting them first if they have no row.
+
+    Args:
+        user_id (int): The user
+
+    Returns:
+        UserStat: The user's counters
+    """
+    stats = db.session.get(UserStat, user_id)
+    if stats is None:
+        try:
+            _recount_users([user_id])
+        except IntegrityError:
+            # Another request created the row first
+            db.session.rollback()
+        stats = db.session.get(UserStat, user_id)
+    return stats
+
+
+def reconcile_user_stats(batch_size=1000):
+    """
+    Recount the profile counters of every user.
+
+    Args:
+        batch_size (int): Users recounted per transaction
+
+    Yields:
+        int: Users recounted so far, after each batch
+    """
+    last_id = 0
+    recounted = 0
+    while True:
+        ids = [user_id for user_id, in db.session.query(User.id)
+               .filter(User.id > last_id).order_by(User.id).limit(batch_size)]
+        if not ids:
+            break
+        _recount_users(ids)
+        recounted += len(ids)
+        last_id = ids[-1]
+        yield recounted
@@ -1,5 +1,6 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import QueuePool
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
@@ -26,6 +27,95 @@ class Config:
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Set to false in production, where `flask db upgrade` owns the schema
+    CREATE_TABLES_ON_STARTUP = os.environ.get('CREATE_TABLES_ON_STARTUP', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Connection pool; SQLite file databases get a pool too, so the pragmas
+    # below and the page cache survive between requests
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 280))  # below MySQL's wait_timeout
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    
+    if DB_TYPE == 'sqlite':
+        SQLALCHEMY_ENGINE_OPTIONS = {} if ':memory:' in SQLALCHEMY_DATABASE_URI else {
+            'poolclass': QueuePool,
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'connect_args': {'check_same_thread': False},
+        }
+    else:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'pool_size': DB_POOL_SIZE,
+            'max_overflow': DB_MAX_OVERFLOW,
+            'pool_timeout': DB_POOL_TIMEOUT,
+            'pool_recycle': DB_POOL_RECYCLE,
+            'pool_pre_ping': DB_POOL_PRE_PING,
+        }
+    
+    # Read replicas: comma-separated URIs; SELECTs in GET requests are spread over them
+    SQLALCHEMY_REPLICA_URIS = [uri.strip() for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',')
+                               if uri.strip()]
+    REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', 30))  # seconds
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))  # primary-only reads after a write
+    
+    # Per-request SQL profiling (headers, log line and /admin/sql); off by default
+    SQL_PROFILER_ENABLED = os.environ.get('SQL_PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    SQL_PROFILER_SLOW_COUNT = int(os.environ.get('SQL_PROFILER_SLOW_COUNT', 5))  # slowest statements logged
+    SQL_PROFILER_REPEAT_THRESHOLD = int(os.environ.get('SQL_PROFILER_REPEAT_THRESHOLD', 3))  # N+1 flag
+    
+    # SQLite pragmas applied to every new connection (see app/database.py)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -65536))  # negative means KiB
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))  # bytes
+    
     # Upload configuration
     UPLOAD_FOLDER = os.path.join(basedir, 'app', 'static', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size 
\ No newline at end of file
+    # Unvalidated upload bytes land here, outside the statically served folder
+    UPLOAD_STAGING_FOLDER = os.environ.get('UPLOAD_STAGING_FOLDER') or \
+        os.path.join(basedir, 'instance', 'uploads-tmp')
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_IMAGE_SIZE = int(os.environ.get('MAX_IMAGE_SIZE', 8 * 1024 * 1024))  # per uploaded image
+    IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))  # threads generating image variants
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))  # WebP quality of variants
+    
+    # Pagination
+    POSTS_PER_PAGE = int(os.environ.get('POSTS_PER_PAGE', 20))
+    NEWS_PER_PAGE = int(os.environ.get('NEWS_PER_PAGE', 10))
+    COMMENTS_PER_PAGE = int(os.environ.get('COMMENTS_PER_PAGE', 20))
+    SEARCH_RESULTS_PER_PAGE = int(os.environ.get('SEARCH_RESULTS_PER_PAGE', 20))
+    ADMIN_USERS_PER_PAGE = int(os.environ.get('ADMIN_USERS_PER_PAGE', 50))
+    
+    # Atom/RSS feeds
+    FEED_TITLE = os.environ.get('FEED_TITLE', 'RPM Forum')
+    FEED_ENTRIES = int(os.environ.get('FEED_ENTRIES', 20))  # newest rows per feed
+    
+    # Admin dashboard counters are recounted when older than this many seconds
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL', 3600))
+    
+    # Page cache configuration
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'lru')  # lru, filesystem, redis, or null
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_LRU_MAX_ENTRIES = int(os.environ.get('CACHE_LRU_MAX_ENTRIES', 1000))
+    CACHE_DIR = os.environ.get('CACHE_DIR') or os.path.join(basedir, 'instance', 'cache')
+    CACHE_DIR_MAX_ENTRIES = int(os.environ.get('CACHE_DIR_MAX_ENTRIES', 2000))  # filesystem backend
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Password hashing; stored hashes are upgraded on login when these change
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:260000')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))  # 0 hashes inline
+    
+    # Activity log writer
+    ACTIVITY_QUEUE_SIZE = int(os.environ.get('ACTIVITY_QUEUE_SIZE', 10000))
+    ACTIVITY_BATCH_SIZE = int(os.environ.get('ACTIVITY_BATCH_SIZE', 500))
+    ACTIVITY_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_FLUSH_INTERVAL', 2))  # seconds
+    ACTIVITY_QUEUE_TIMEOUT = float(os.environ.get('ACTIVITY_QUEUE_TIMEOUT', 5))  # seconds
+    
+    # Per-process cache of users' effective permissions
+    PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get('PRINCIPAL_CACHE_MAX_ENTRIES', 10000))
+    PRINCIPAL_CACHE_TIMEOUT = int(os.environ.get('PRINCIPAL_CACHE_TIMEOUT', 60))  # seconds
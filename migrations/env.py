@@ -71,6 +71,19 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Leave the full-text search tables out of autogenerate.
+
+    The search module creates ``search_index`` and, on SQLite, the FTS5
+    shadow tables ``search_index_*`` at runtime; they have no models.
+
+    Returns:
+        bool: False for the search tables, else True
+    """
+    return not (type_ == 'table' and name.startswith('search_index'))
+
+
 def run_migrations_offline():
     """
     Run migrations in 'offline' mode.
@@ -90,6 +103,7 @@ def run_migrations_offline():
         url=url,
         target_metadata=get_metadata(),
         literal_binds=True,
+        include_object=include_object,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -119,7 +133,8 @@ def run_migrations_online():
     with connectable.connect() as connection:
         context.configure(
             connection=connection, 
-            target_metadata=get_metadata()
+            target_metadata=get_metadata(),
+            include_object=include_object,
         )
 
         with context.begin_transaction():
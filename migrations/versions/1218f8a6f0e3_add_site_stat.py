@@ -0,0 +1,33 @@
+"""Add site_stat table for admin dashboard counters
+
+Revision ID: 1218f8a6f0e3
+Revises: 36bed451dc04
+Create Date: 2025-04-11 15:02:38.417265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1218f8a6f0e3'
+down_revision = '36bed451dc04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app factory's create_all may already have created the table
+    if sa.inspect(op.get_bind()).has_table('site_stat'):
+        return
+    # Rows are filled in on the first dashboard load or by `flask counters stats`
+    op.create_table('site_stat',
+    sa.Column('name', sa.String(length=32), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('reconciled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('site_stat')
@@ -0,0 +1,44 @@
+"""Add indexes for listing filters and sorts
+
+Revision ID: 35b9d9e24b43
+Revises: 1218f8a6f0e3
+Create Date: 2025-04-14 10:18:06.552913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '35b9d9e24b43'
+down_revision = '1218f8a6f0e3'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns); composite indexes end in the primary key
+# because keyset pagination orders by (timestamp, id)
+INDEXES = [
+    ('ix_post_created_at_id', 'post', ['created_at', 'id']),
+    ('ix_post_category_id_created_at_id', 'post', ['category_id', 'created_at', 'id']),
+    ('ix_post_author_id_created_at_id', 'post', ['author_id', 'created_at', 'id']),
+    ('ix_comment_post_id_created_at_id', 'comment', ['post_id', 'created_at', 'id']),
+    ('ix_comment_author_id', 'comment', ['author_id']),
+    ('ix_news_created_at_id', 'news', ['created_at', 'id']),
+    ('ix_news_subject_created_at_id', 'news', ['subject', 'created_at', 'id']),
+    ('ix_activity_timestamp', 'activity', ['timestamp']),
+    ('ix_user_role_id', 'user', ['role_id']),
+]
+
+
+def upgrade():
+    # The app factory's create_all may already have created some of them
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,36 @@
+"""Add post image_url and widen user avatar
+
+Revision ID: 36bed451dc04
+Revises: 9db0d2ee6d80
+Create Date: 2025-04-09 11:27:53.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '36bed451dc04'
+down_revision = '9db0d2ee6d80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('post', sa.Column('image_url', sa.String(length=80), nullable=True))
+    # Uploads are now named by their SHA-256 digest
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('avatar',
+               existing_type=sa.String(length=20),
+               type_=sa.String(length=80),
+               existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.alter_column('avatar',
+               existing_type=sa.String(length=80),
+               type_=sa.String(length=20),
+               existing_nullable=True)
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('image_url')
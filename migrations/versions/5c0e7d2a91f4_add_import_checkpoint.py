@@ -0,0 +1,37 @@
+"""Add import_checkpoint table for resumable JSONL imports
+
+Revision ID: 5c0e7d2a91f4
+Revises: 35b9d9e24b43
+Create Date: 2025-04-16 09:41:12.208531
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c0e7d2a91f4'
+down_revision = '35b9d9e24b43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app factory's create_all may already have created the table
+    if sa.inspect(op.get_bind()).has_table('import_checkpoint'):
+        return
+    op.create_table('import_checkpoint',
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('source', sa.String(length=255), nullable=False),
+    sa.Column('offset', sa.BigInteger(), nullable=False),
+    sa.Column('line', sa.Integer(), nullable=False),
+    sa.Column('imported', sa.Integer(), nullable=False),
+    sa.Column('rejected', sa.Integer(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('kind', 'source')
+    )
+
+
+def downgrade():
+    op.drop_table('import_checkpoint')
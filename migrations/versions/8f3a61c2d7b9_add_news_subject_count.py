@@ -0,0 +1,37 @@
+"""Add news_subject_count table for the news facet sidebar
+
+Revision ID: 8f3a61c2d7b9
+Revises: 5c0e7d2a91f4
+Create Date: 2025-04-18 14:22:47.915306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a61c2d7b9'
+down_revision = '5c0e7d2a91f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # The app factory's create_all may already have created the table
+    if not sa.inspect(bind).has_table('news_subject_count'):
+        op.create_table('news_subject_count',
+        sa.Column('subject', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('subject')
+        )
+    # Seed the counts from existing articles; the routes keep them current from here on
+    if bind.execute(sa.text('SELECT COUNT(*) FROM news_subject_count')).scalar() == 0:
+        bind.execute(sa.text(
+            'INSERT INTO news_subject_count (subject, count) '
+            'SELECT subject, COUNT(*) FROM news GROUP BY subject'
+        ))
+
+
+def downgrade():
+    op.drop_table('news_subject_count')
@@ -0,0 +1,64 @@
+"""Add full-text search index
+
+Revision ID: 9db0d2ee6d80
+Revises: b968b3dffcb1
+Create Date: 2025-04-05 16:42:08.531274
+
+Existing content is not copied here; run `flask search rebuild` after
+upgrading to populate the index. The structures may already exist when
+db.create_all() has run, so each step checks first.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql, postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9db0d2ee6d80'
+down_revision = 'b968b3dffcb1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+            "USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif sa.inspect(bind).has_table('search_document'):
+        return
+    elif dialect == 'postgresql':
+        op.create_table('search_document',
+            sa.Column('kind', sa.String(length=16), nullable=False),
+            sa.Column('doc_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.Text(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('tsv', postgresql.TSVECTOR(), nullable=False),
+            sa.PrimaryKeyConstraint('kind', 'doc_id')
+        )
+        op.create_index('ix_search_document_tsv', 'search_document', ['tsv'],
+                        postgresql_using='gin')
+    elif dialect == 'mysql':
+        op.create_table('search_document',
+            sa.Column('kind', sa.String(length=16), nullable=False),
+            sa.Column('doc_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.Text(), nullable=False),
+            sa.Column('content', mysql.MEDIUMTEXT(), nullable=False),
+            sa.PrimaryKeyConstraint('kind', 'doc_id'),
+            mysql_engine='InnoDB',
+            mysql_charset='utf8mb4'
+        )
+        op.create_index('ix_search_document_fulltext', 'search_document',
+                        ['title', 'content'], mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_index')
+    else:
+        op.drop_table('search_document')
@@ -0,0 +1,59 @@
+"""Add user_stat table for profile counters
+
+Revision ID: a4d2c9e7f183
+Revises: 8f3a61c2d7b9
+Create Date: 2025-04-21 09:41:12.603814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d2c9e7f183'
+down_revision = '8f3a61c2d7b9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    # The app factory's create_all may already have created the table and index
+    if not inspector.has_table('user_stat'):
+        op.create_table('user_stat',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_count', sa.Integer(), nullable=False),
+        sa.Column('comment_count', sa.Integer(), nullable=False),
+        sa.Column('news_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+    if 'ix_news_author_id' not in {index['name'] for index in inspector.get_indexes('news')}:
+        op.create_index('ix_news_author_id', 'news', ['author_id'], unique=False)
+    # Seed the counters of existing users; the routes keep them current from here on.
+    # Built with Core so each dialect quotes "user" its own way.
+    user = sa.table('user', sa.column('id'))
+    user_stat = sa.table('user_stat', sa.column('user_id'), sa.column('post_count'),
+                         sa.column('comment_count'), sa.column('news_count'),
+                         sa.column('updated_at'))
+
+    def written(name):
+        content = sa.table(name, sa.column('author_id'))
+        return sa.select(sa.func.count()).select_from(content) \
+            .where(content.c.author_id == user.c.id) \
+            .scalar_subquery()
+
+    has_row = sa.exists().where(user_stat.c.user_id == user.c.id)
+    bind.execute(user_stat.insert().from_select(
+        ['user_id', 'post_count', 'comment_count', 'news_count', 'updated_at'],
+        sa.select(user.c.id, written('post'), written('comment'), written('news'),
+                  sa.func.current_timestamp())
+        .where(~has_row)
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_news_author_id', table_name='news')
+    op.drop_table('user_stat')
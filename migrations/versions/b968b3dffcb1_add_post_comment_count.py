@@ -0,0 +1,30 @@
+"""Add post comment_count
+
+Revision ID: b968b3dffcb1
+Revises: 1703868a6bed
+Create Date: 2025-04-02 10:14:37.218406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b968b3dffcb1'
+down_revision = '1703868a6bed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('post', sa.Column('comment_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill existing rows; `flask counters comments` repairs drift later on
+    op.execute(
+        'UPDATE post SET comment_count = '
+        '(SELECT COUNT(*) FROM comment WHERE comment.post_id = post.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('post') as batch_op:
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,33 @@
+"""Add category post_count
+
+Revision ID: c7e18b5d3f20
+Revises: a4d2c9e7f183
+Create Date: 2025-04-23 16:05:29.481127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e18b5d3f20'
+down_revision = 'a4d2c9e7f183'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app factory's create_all may already have created the column
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('category')}
+    if 'post_count' not in columns:
+        op.add_column('category', sa.Column('post_count', sa.Integer(), nullable=False, server_default='0'))
+    # Backfill existing rows; `flask counters categories` repairs drift later on
+    op.execute(
+        'UPDATE category SET post_count = '
+        '(SELECT COUNT(*) FROM post WHERE post.category_id = category.id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('category') as batch_op:
+        batch_op.drop_column('post_count')
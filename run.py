@@ -5,11 +5,9 @@ This module initializes and runs the Flask application using the factory pattern
 It serves as the main entry point for starting the web server.
 """
 
-from flask_migrate import Migrate
-from app import create_app, db
+from app import create_app
 
 app = create_app()
-migrate = Migrate(app, db)
 
 if __name__ == '__main__':
     app.run(debug=True)